@@ -0,0 +1,72 @@
+"""Index existing recordings/session_* folders for /search_transcript
+
+Usage: python backfill.py [recordings_dir]
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+from services.job_queue import JobQueue
+from services.session_index import SessionIndex
+
+
+def legacy_segments(participants) -> list[dict]:
+    """Sessions from before segments.jsonl: one untimed segment per speaker"""
+    segments = []
+    for participant in participants:
+        path = participant["transcript_path"]
+        if not path or not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            # Skip the header written above the "=====" rule
+            text = f.read().split("=" * 50 + "\n\n", 1)[-1].strip()
+        if text:
+            segments.append(
+                {
+                    "start": 0.0,
+                    "end": participant["audio_seconds"],
+                    "user_id": participant["user_id"],
+                    "speaker": participant["name"],
+                    "text": text,
+                }
+            )
+    return segments
+
+
+def main():
+    load_dotenv()
+    recordings_dir = sys.argv[1] if len(sys.argv) > 1 else "recordings"
+    index = SessionIndex(
+        os.getenv(
+            "SESSION_INDEX_PATH", os.path.join(recordings_dir, "sessions.sqlite")
+        )
+    )
+
+    queue = JobQueue(
+        os.getenv("JOB_QUEUE_PATH", os.path.join(recordings_dir, "jobs.sqlite"))
+    )
+
+    # Sessions the bot recorded are indexed by the bot, with their guild
+    imported = index.import_folders(recordings_dir, queue.session_names(), force=True)
+    print(f"Imported {imported} new session folders")
+
+    indexed_sessions = 0
+    indexed_segments = 0
+    for session in index.unsearchable_sessions():
+        segments_path = os.path.join(session["folder"], "segments.jsonl")
+        if os.path.exists(segments_path):
+            count = index.add_segments_file(session["id"], segments_path)
+        else:
+            count = index.add_segments(
+                session["id"], legacy_segments(index.participants(session["id"]))
+            )
+        if count:
+            indexed_sessions += 1
+            indexed_segments += count
+            print(f"session_{session['name']}: {count} segments")
+
+    print(f"Indexed {indexed_segments} segments from {indexed_sessions} sessions")
+
+
+if __name__ == "__main__":
+    main()
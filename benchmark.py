@@ -0,0 +1,360 @@
+"""Offline end-to-end benchmark of the record → transcribe → publish pipeline
+
+Generates a synthetic multi-speaker session, feeds it packet by packet
+through the real StreamingSink and Recording cog (with a stub bot, fake
+voice client and fake text channel), and prints one JSON object with wall
+time per stage, real-time factor, peak RSS and bytes written. Nothing
+touches Discord or the network; by default the model is a stub that
+returns placeholder text at a configurable cost per second of speech.
+
+Usage: python benchmark.py [--speakers 4] [--minutes 5] [--speech-ratio 0.6]
+                           [--model stub|tiny|base...] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import cast
+import discord
+import numpy as np
+from cogs.recording import Recording
+from services.audio import SAMPLE_RATE
+from services.game_service import GameService
+from services.job_queue import LiveTranscription
+from services.sinks import StreamingSink
+from services.transcription import Transcriber, TranscriptionPool
+
+# 20 ms packets of 48 kHz stereo s16le, as py-cord hands them to a sink
+PACKET_SAMPLES = 960
+CAPTURE_RATE = 48000
+
+
+def synthetic_session(
+    speakers: int, seconds: float, speech_ratio: float, seed: int = 0
+) -> np.ndarray:
+    """Who is talking in each 20 ms packet: a (packets, speakers) bool array
+
+    Utterances of 1-6 s go to random speakers with pauses in between sized
+    so that roughly ``speech_ratio`` of the session has someone talking.
+    """
+    rng = np.random.default_rng(seed)
+    packets = int(seconds * CAPTURE_RATE / PACKET_SAMPLES)
+    talking = np.zeros((packets, speakers), dtype=bool)
+    position = 0
+    mean_pause = 3.5 * (1 - speech_ratio) / max(speech_ratio, 0.01)
+    while position < packets:
+        length = int(rng.uniform(1, 6) * 50)
+        talking[position : position + length, rng.integers(speakers)] = True
+        position += length + int(rng.exponential(mean_pause) * 50)
+    return talking
+
+
+def voice_packet(rng, pitch: float, phase: float, speaking: bool) -> tuple[bytes, float]:
+    """One packet of a buzzy harmonic 'voice' or faint background noise"""
+    t = (np.arange(PACKET_SAMPLES) + phase) / CAPTURE_RATE
+    if speaking:
+        wave = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        wave = 0.25 * wave * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    else:
+        wave = np.zeros(PACKET_SAMPLES)
+    wave = wave + rng.normal(0, 0.002, PACKET_SAMPLES)
+    pcm = np.clip(wave * 32767, -32768, 32767).astype("<i2")
+    return np.repeat(pcm, 2).tobytes(), phase + PACKET_SAMPLES
+
+
+class StubTranscriber(Transcriber):
+    """Stands in for Whisper: placeholder text, optionally at a simulated cost"""
+
+    def __init__(self, cost: float = 0.0):
+        super().__init__("stub", 1)
+        self.cost = cost
+
+    async def transcribe_batch(self, batch, model_name=None):
+        if self.cost:
+            seconds = sum(len(samples) for samples in batch) / SAMPLE_RATE
+            # Occupy a thread the way a worker process would be occupied
+            await asyncio.to_thread(time.sleep, seconds * self.cost)
+        results = []
+        for samples in batch:
+            duration = len(samples) / SAMPLE_RATE
+            segments = [
+                {
+                    "start": float(start),
+                    "end": min(float(start) + 3, duration),
+                    "text": " lorem ipsum dolor sit amet",
+                }
+                for start in np.arange(0, duration, 3.0)
+            ]
+            results.append(
+                {"text": "".join(s["text"] for s in segments), "segments": segments}
+            )
+        return results
+
+    async def warm_up(self, model_name=None):
+        pass
+
+
+class FakeMessage:
+    def __init__(self, channel: "FakeChannel", content):
+        self.channel = channel
+        self.content = content
+
+    async def edit(self, content=None, **kwargs):
+        self.channel.edits += 1
+        self.content = content
+        return self
+
+
+class FakeChannel:
+    """Collects what the cog would post, counting messages, edits and attachment bytes"""
+
+    def __init__(self):
+        self.id = 1
+        self.messages = 0
+        self.edits = 0
+        self.uploaded_bytes = 0
+
+    async def send(self, content=None, *, file=None, files=None, **kwargs):
+        self.messages += 1
+        for attachment in [file] if file else files or []:
+            attachment.fp.seek(0, os.SEEK_END)
+            self.uploaded_bytes += attachment.fp.tell()
+            attachment.close()
+        return FakeMessage(self, content)
+
+
+class StubBot:
+    """Just enough of a Bot for the Recording cog, with no network"""
+
+    def __init__(self, speakers: int):
+        self.users = {
+            1000 + i: SimpleNamespace(id=1000 + i, name=f"speaker{i}")
+            for i in range(speakers)
+        }
+        self.games = GameService.from_env()
+
+    def get_guild(self, guild_id):
+        return None
+
+    def get_user(self, user_id):
+        return None
+
+    async def fetch_user(self, user_id):
+        return self.users[user_id]
+
+    def get_channel(self, channel_id):
+        return None
+
+
+def folder_bytes(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def _peak_rss_of(pid: int) -> float | None:
+    """High-water resident memory of a live process in MB, where /proc has it"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb(worker_pids: list[int]) -> dict:
+    # ru_maxrss is in KiB on Linux. Other children (ffmpeg) are not workers,
+    # so the workers are measured by pid while they are still running
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    workers = [rss for rss in map(_peak_rss_of, worker_pids) if rss is not None]
+    return {
+        "bot": round(own, 1),
+        "largest_worker": round(max(workers), 1) if workers else None,
+    }
+
+
+def git_revision() -> str | None:
+    """Commit being benchmarked, read from .git without forking a child process"""
+    git_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".git")
+    try:
+        with open(os.path.join(git_dir, "HEAD")) as f:
+            head = f.read().strip()
+        if not head.startswith("ref: "):
+            return head[:12]
+        ref = head.removeprefix("ref: ")
+        ref_path = os.path.join(git_dir, ref)
+        if os.path.exists(ref_path):
+            with open(ref_path) as f:
+                return f.read().strip()[:12]
+        with open(os.path.join(git_dir, "packed-refs")) as f:
+            for line in f:
+                if line.rstrip().endswith(" " + ref):
+                    return line[:12]
+    except OSError:
+        pass
+    return None
+
+
+class Stages:
+    """Wall time of each pipeline stage, wrapping the cog's own coroutines"""
+
+    def __init__(self):
+        self.seconds = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def wrap(self, stage: str, func):
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - started)
+
+        return timed
+
+
+async def run(args) -> dict:
+    stages = Stages()
+    bot = StubBot(args.speakers)
+    cog = Recording(bot)
+    cog.transcriber.shutdown()
+    if args.model == "stub":
+        transcriber = StubTranscriber(args.stub_cost)
+    else:
+        transcriber = TranscriptionPool(model_name=args.model, workers=args.workers)
+    cog.transcriber = transcriber
+    cog.scheduler.pool = transcriber
+    cog.scheduler.concurrency = args.workers
+    await cog.scheduler.start()
+
+    # The same setup start_recording does, minus the voice connection
+    loop = asyncio.get_running_loop()
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    folder = os.path.join(cog.recordings_dir, f"session_{timestamp}")
+    os.makedirs(folder)
+    model_name = transcriber.model_for(None)
+    cog.queue.add_session(timestamp, folder, None, 1, 2, model_name)
+    live = LiveTranscription(
+        cog.scheduler, timestamp, folder, None, model_name, loop, cog.chunk_seconds
+    )
+    sink = StreamingSink(folder, live.feed, cog.window_seconds, cog.buffer_size)
+
+    async def disconnect():
+        pass
+
+    sink.init(SimpleNamespace(disconnect=disconnect))
+
+    talking = synthetic_session(args.speakers, args.minutes * 60, args.speech_ratio)
+    audio_seconds = len(talking) * PACKET_SAMPLES / CAPTURE_RATE
+
+    def record():
+        # Runs in a thread like py-cord's decoder; the loop keeps transcribing
+        rng = np.random.default_rng(1)
+        phases = [0.0] * args.speakers
+        pitches = [110 + 40 * i for i in range(args.speakers)]
+        for row in talking:
+            for speaker, speaking in enumerate(row):
+                data, phases[speaker] = voice_packet(
+                    rng, pitches[speaker], phases[speaker], speaking
+                )
+                sink.write(data, 1000 + speaker)
+        sink.cleanup()
+
+    started = time.perf_counter()
+    await asyncio.to_thread(record)
+    stages.add("record", time.perf_counter() - started)
+
+    cog.scheduler.wait_session = stages.wrap(
+        "transcribe_drain", cog.scheduler.wait_session
+    )
+    cog.archiver.compress = stages.wrap("archive", cog.archiver.compress)
+    cog.names.resolve = stages.wrap("resolve_names", cog.names.resolve)
+    channel = FakeChannel()
+    channel.send = stages.wrap("publish", channel.send)
+
+    started = time.perf_counter()
+    # Duck-typed: it has the one method the cog and publisher call
+    await cog.once_done(sink, cast(discord.abc.Messageable, channel))
+    stages.add("finish", time.perf_counter() - started)
+
+    cog.scheduler.stop()
+    # Pool workers are keyed by pid; the stub runs in the bot process
+    rss = peak_rss_mb([key for key in transcriber.worker_models if isinstance(key, int)])
+    transcriber.shutdown()
+    bot.games.close()
+    total = stages.seconds["record"] + stages.seconds["finish"]
+    return {
+        "revision": git_revision(),
+        "config": vars(args),
+        "audio_seconds": round(audio_seconds, 2),
+        "speech_seconds": round(
+            float(talking.sum()) * PACKET_SAMPLES / CAPTURE_RATE, 2
+        ),
+        "chunks": cog.queue.db.execute(
+            "SELECT COUNT(*) FROM jobs WHERE session = ?", (timestamp,)
+        ).fetchone()[0],
+        "stages": {stage: round(s, 4) for stage, s in stages.seconds.items()},
+        "total_seconds": round(total, 4),
+        # Wall seconds of processing per second of recorded audio
+        "real_time_factor": round(total / audio_seconds, 5),
+        "peak_rss_mb": rss,
+        "bytes_written": folder_bytes(cog.recordings_dir),
+        "bytes_uploaded": channel.uploaded_bytes,
+        "messages": channel.messages,
+        "edits": channel.edits,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--speakers", type=int, default=4)
+    parser.add_argument("--minutes", type=float, default=5)
+    parser.add_argument("--speech-ratio", type=float, default=0.6)
+    parser.add_argument(
+        "--model", default="stub", help="'stub', or a Whisper model already downloaded"
+    )
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument(
+        "--stub-cost",
+        type=float,
+        default=0.0,
+        help="simulated seconds of model time per second of speech",
+    )
+    parser.add_argument("--output", help="also write the JSON result here")
+    args = parser.parse_args()
+
+    # Everything the run writes goes to a scratch directory
+    root = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory(prefix="dnd-benchmark-") as scratch:
+        os.chdir(scratch)
+        for name in (
+            "SESSION_INDEX_PATH",
+            "JOB_QUEUE_PATH",
+            "TRANSCRIPT_CACHE_DIR",
+            "GAME_DB_PATH",
+            "TRANSCRIPTION_WORKER_ADDRESSES",
+        ):
+            os.environ.pop(name, None)
+        result = asyncio.run(run(args))
+        os.chdir(root)
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,71 @@
 import discord
 from discord.ext import commands
+import asyncio
+import sys
+import time
+import traceback
+from services.job_queue import TRANSCRIBED_SECONDS, real_time_factor
+from services.metrics import (
+    COMMAND_SECONDS,
+    MetricsExporter,
+    describe_histogram,
+    metrics,
+    rss_bytes,
+)
+
+
+def describe_duration(seconds: float) -> str:
+    """"2d 3h 4m" for an uptime"""
+    minutes, _ = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return " ".join(
+        f"{value}{unit}"
+        for value, unit in ((days, "d"), (hours, "h"), (minutes, "m"))
+        if value
+    ) or "<1m"
 
 
 class Admin(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.exporter = MetricsExporter.from_env(metrics)
+        # Interaction id -> perf_counter at invocation, for command latency
+        self.invoked: dict[int, float] = {}
+
+    def cog_unload(self):
+        asyncio.create_task(self.exporter.stop())
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        try:
+            await self.exporter.start()
+        except Exception as e:
+            print(f"Cannot start the metrics exporter: {e}")
+
+    @commands.Cog.listener()
+    async def on_application_command(self, ctx: discord.ApplicationContext):
+        self.invoked[ctx.interaction.id] = time.perf_counter()
+
+    def _command_done(self, ctx: discord.ApplicationContext, outcome: str) -> None:
+        started = self.invoked.pop(ctx.interaction.id, None)
+        if started is not None:
+            COMMAND_SECONDS.observe(
+                time.perf_counter() - started,
+                command=ctx.command.qualified_name if ctx.command else "unknown",
+                outcome=outcome,
+            )
+
+    @commands.Cog.listener()
+    async def on_application_command_completion(self, ctx: discord.ApplicationContext):
+        self._command_done(ctx, "ok")
+
+    @commands.Cog.listener()
+    async def on_application_command_error(self, ctx: discord.ApplicationContext, error):
+        self._command_done(ctx, "error")
+        # Any listener replaces py-cord's default handler, so keep its traceback
+        print(f"Ignoring exception in command {ctx.command}:", file=sys.stderr)
+        traceback.print_exception(type(error), error, error.__traceback__)
 
     def _is_admin(self, ctx: discord.ApplicationContext) -> bool:
         """Check if user has admin permissions (server admin or bot owner)"""
@@ -134,7 +195,44 @@ class Admin(commands.Cog):
             inline=True,
         )
 
-        embed.set_footer(text=f"Bot ID: {self.bot.user.id}")
+        embed.add_field(
+            name="⏲️ Uptime",
+            value=describe_duration(time.time() - metrics.started),
+            inline=True,
+        )
+        embed.add_field(
+            name="🧠 Memory", value=f"{rss_bytes() / 1024 / 1024:.0f} MB", inline=True
+        )
+
+        rtf = real_time_factor()
+        embed.add_field(
+            name="🎙️ Transcription",
+            value=f"{TRANSCRIBED_SECONDS.value() / 3600:.2f} h of speech"
+            + (f" at {rtf:.3f}× real time" if rtf is not None else ""),
+            inline=True,
+        )
+
+        # The slowest commands by p95, from the latency histogram
+        commands_seen = sorted(
+            COMMAND_SECONDS.label_sets(),
+            key=lambda labels: -(COMMAND_SECONDS.quantile(0.95, **labels) or 0),
+        )
+        embed.add_field(
+            name="⏱️ Command Latency (since restart)",
+            value="\n".join(
+                f"/{labels['command']}"
+                + (" (failed)" if labels["outcome"] != "ok" else "")
+                + f": {describe_histogram(COMMAND_SECONDS, **labels)}"
+                for labels in commands_seen[:5]
+            )
+            or "No commands run yet",
+            inline=False,
+        )
+
+        footer = f"Bot ID: {self.bot.user.id}"
+        if self.exporter.port is not None:
+            footer += f" • Metrics on port {self.exporter.port}"
+        embed.set_footer(text=footer)
         await ctx.respond(embed=embed, ephemeral=True)
 
 
@@ -5,6 +5,7 @@ from discord.ext import commands
 class Game(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.games = bot.games
 
     game = discord.SlashCommandGroup("game", "Commands related to game settings")
 
@@ -1,12 +1,83 @@
 import discord
-from discord.sinks import Sink
 from discord.ext import commands
+import asyncio
+import json
 import os
 from datetime import datetime
-import whisper
+import numpy as np
+from services.archive import ArchiveEncoder, find_archive
+from services.audio import SAMPLE_RATE
+from services.job_queue import (
+    TRANSCRIBED_SECONDS,
+    JobQueue,
+    LiveTranscription,
+    TranscriptionScheduler,
+    real_time_factor,
+)
+from services.metrics import (
+    PIPELINE_SECONDS,
+    StageTimer,
+    describe_histogram,
+    metrics,
+    rss_bytes,
+)
+from services.model_tiers import DEFAULT_COST, ModelTierPolicy
+from services.names import NameResolver, speaker_label
+from services.publisher import SessionPublisher
+from services.retention import RetentionEngine, RetentionPolicy
+from services.session_index import SessionIndex, session_started_at
+from services.sinks import BYTES_PER_SECOND, StreamingSink, repair_wav_header
+from services.transcript_cache import TranscriptCache
+from services.transcription import transcriber_from_env
+from services.transcripts import (
+    format_timestamp,
+    merge_segments,
+    speaker_segments,
+    write_transcript,
+)
 
-# Load a faster model for real-time transcription
-whisper_model = whisper.load_model("base")
+SESSION_SECONDS = metrics.histogram(
+    "session_finish_seconds", "Wall time from the end of a recording to its results"
+)
+SESSIONS_FINISHED = metrics.counter(
+    "sessions_finished_total", "Recorded sessions whose transcripts were written"
+)
+RECORDED_SECONDS = metrics.counter(
+    "recorded_audio_seconds_total", "Seconds of participant audio in finished sessions"
+)
+# finish_session's stages, in order, as shown by /transcription_status
+STAGES = (
+    "flush_audio",
+    "disconnect",
+    "announce",
+    "resolve_names",
+    "prepare_audio",
+    "transcribe_wait",
+    "write_transcripts",
+    "archive_wait",
+    "index",
+    "publish",
+)
+
+
+def describe_models(models: dict[str, int]) -> str:
+    """"base (12 chunks), tiny (3 chunks)", most used first"""
+    return ", ".join(
+        f"{name} ({chunks} chunk{'s' if chunks != 1 else ''})"
+        for name, chunks in sorted(models.items(), key=lambda item: -item[1])
+    )
+
+
+def describe_policy(policy: RetentionPolicy) -> str:
+    tiers = []
+    if policy.compress_days is not None:
+        tiers.append(f"uncompressed originals removed after {policy.compress_days:g} days")
+    if policy.delete_audio_days is not None:
+        tiers.append(f"all audio deleted after {policy.delete_audio_days:g} days")
+    if policy.quota_bytes is not None:
+        tiers.append(f"quota {policy.quota_bytes / 1024 / 1024:.0f} MB")
+    tiers.append("transcripts kept forever")
+    return ", ".join(tiers).capitalize()
 
 
 class Recording(commands.Cog):
@@ -15,6 +86,165 @@ class Recording(commands.Cog):
         self.connections = {}
         self.recordings_dir = "recordings"
         os.makedirs(self.recordings_dir, exist_ok=True)
+        self.index = SessionIndex(
+            os.getenv(
+                "SESSION_INDEX_PATH", os.path.join(self.recordings_dir, "sessions.sqlite")
+            )
+        )
+        self.page_size = 10
+        self.archiver = ArchiveEncoder.from_env()
+        self.names = NameResolver(
+            bot, ttl=float(os.getenv("USER_NAME_CACHE_SECONDS", "3600"))
+        )
+        # Shared with every cog; the bot flushes it on close
+        self.games = bot.games
+        self.retention = RetentionEngine.from_env(
+            self.index,
+            self.archiver,
+            active_sessions=lambda: set(self.scheduler.outstanding),
+        )
+        self.transcriber = transcriber_from_env()
+        self.queue = JobQueue(
+            os.getenv("JOB_QUEUE_PATH", os.path.join(self.recordings_dir, "jobs.sqlite"))
+        )
+        self.cache = TranscriptCache(
+            os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(self.recordings_dir, "cache")),
+            int(os.getenv("TRANSCRIPT_CACHE_BYTES", str(256 * 1024 * 1024))),
+        )
+        concurrency = os.getenv("TRANSCRIPTION_CONCURRENCY")
+        self.scheduler = TranscriptionScheduler(
+            self.queue,
+            self.transcriber,
+            int(concurrency) if concurrency else self.transcriber.workers,
+            batch_size=int(os.getenv("TRANSCRIPTION_BATCH_SIZE", "8")),
+            max_wait=float(os.getenv("TRANSCRIPTION_BATCH_WAIT_SECONDS", "2")),
+            cache=self.cache,
+            policy=ModelTierPolicy.parse(
+                os.getenv("WHISPER_MODEL_TIERS", ""),
+                float(os.getenv("TRANSCRIPTION_TARGET_LATENCY_SECONDS", "1800")),
+            ),
+        )
+        self.resumed = False
+        self.window_seconds = float(os.getenv("TRANSCRIPTION_WINDOW_SECONDS", "30"))
+        self.chunk_seconds = float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "30"))
+        self.buffer_size = int(os.getenv("RECORDING_BUFFER_BYTES", str(1024 * 1024)))
+        self._register_gauges()
+
+    def _register_gauges(self) -> None:
+        """Gauges read from the cog's state whenever metrics are exported"""
+        metrics.gauge(
+            "transcription_jobs_pending",
+            "Chunks waiting for a model",
+            lambda: len(self.scheduler.pending),
+        )
+        metrics.gauge(
+            "transcription_jobs_running",
+            "Chunks in batches being transcribed",
+            lambda: len(self.scheduler.running),
+        )
+        metrics.gauge(
+            "transcription_sessions_outstanding",
+            "Sessions with chunks still to transcribe",
+            lambda: len(self.scheduler.outstanding),
+        )
+        metrics.gauge(
+            "whisper_model_load_seconds",
+            "Time the last warm-up took to load each model",
+            lambda: [
+                ({"model": name}, seconds)
+                for name, seconds in self.transcriber.load_times.items()
+            ],
+        )
+        metrics.gauge(
+            "whisper_workers_loaded",
+            "Workers holding each model in memory",
+            lambda: [
+                ({"model": name}, workers)
+                for name, workers in self.transcriber.status().items()
+            ],
+        )
+        metrics.gauge(
+            "transcript_cache_bytes",
+            "Bytes of transcripts in the cache",
+            lambda: self.cache.stats()["bytes"],
+        )
+        metrics.gauge(
+            "voice_connections",
+            "Voice channels currently being recorded",
+            lambda: len(self.connections),
+        )
+
+    def cog_unload(self):
+        self.scheduler.stop()
+        self.retention.stop()
+        self.transcriber.shutdown()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Warm the default model in the background once the gateway is up
+        asyncio.create_task(self.transcriber.warm_up())
+
+        # on_ready fires again on reconnects; only resume once per process
+        if not self.resumed:
+            self.resumed = True
+            await self.scheduler.start()
+            self.retention.start()
+            for session in await asyncio.to_thread(self.queue.unfinished_sessions):
+                print(f"Resuming transcription of session {session['name']}")
+                if session["state"] == "recording":
+                    await self._queue_unsent_audio(session)
+                asyncio.create_task(self.finish_session(session["name"]))
+
+            # Pick up session folders recorded before the index existed, once;
+            # anything the job queue knows is indexed by finish_session instead
+            imported = await asyncio.to_thread(
+                self.index.import_folders,
+                self.recordings_dir,
+                await asyncio.to_thread(self.queue.session_names),
+            )
+            if imported:
+                print(f"Indexed {imported} existing recording sessions")
+
+    async def _queue_unsent_audio(self, session) -> None:
+        """Queue the audio a crashed recording wrote but never cut into windows"""
+        folder = session["folder"]
+        try:
+            streams = [f for f in os.listdir(folder) if f.endswith("_16k.f32")]
+        except FileNotFoundError:
+            return
+        queued = await asyncio.to_thread(self.queue.queued_until, session["name"])
+        live = LiveTranscription(
+            self.scheduler,
+            session["name"],
+            folder,
+            session["guild_id"],
+            session["model"],
+            asyncio.get_running_loop(),
+            self.chunk_seconds,
+        )
+        for stream in streams:
+            user_id = int(stream.removesuffix("_16k.f32"))
+            last_window, queued_end = queued.get(user_id, (-1, 0))
+            path = os.path.join(folder, stream)
+            # A crash can leave half a sample at the end of the file
+            available = os.path.getsize(path) // 4
+            if available <= queued_end:
+                continue
+            samples = await asyncio.to_thread(
+                np.fromfile,
+                path,
+                np.float32,
+                available - queued_end,
+                offset=queued_end * 4,
+            )
+            await asyncio.to_thread(
+                live.feed, user_id, last_window + 1, queued_end / SAMPLE_RATE, samples
+            )
+
+    def _page(self, total: int, page: int) -> tuple[int, int]:
+        """Clamp a 1-based page number and return it with the page count"""
+        pages = max(1, -(-total // self.page_size))
+        return min(max(page, 1), pages), pages
 
     @discord.slash_command()
     async def start_recording(self, ctx: discord.ApplicationContext):
@@ -27,132 +257,412 @@ class Recording(commands.Cog):
 
         if not voice:
             await ctx.respond("You aren't in a voice channel!")
+            return
 
         vc = await voice.channel.connect()
         self.connections.update({ctx.guild.id: vc})
 
+        # Create timestamp for folder name; audio is written here as it arrives.
+        # The guild id keeps sessions started in the same second apart
+        timestamp = f"{datetime.now():%Y%m%d_%H%M%S}_{ctx.guild.id}"
+        session_folder = os.path.join(self.recordings_dir, f"session_{timestamp}")
+        os.makedirs(session_folder, exist_ok=True)
+
+        model_name = self.transcriber.model_for(ctx.guild.id)
+        try:
+            await asyncio.to_thread(
+                self.queue.add_session,
+                timestamp,
+                session_folder,
+                ctx.guild.id,
+                ctx.channel.id,
+                voice.channel.id,
+                model_name,
+            )
+        except Exception:
+            # Without a session row nothing would ever close this connection
+            self.connections.pop(ctx.guild.id, None)
+            await vc.disconnect()
+            raise
+
+        # Audio is queued for transcription window by window while recording
+        live = LiveTranscription(
+            self.scheduler,
+            timestamp,
+            session_folder,
+            ctx.guild.id,
+            model_name,
+            asyncio.get_running_loop(),
+            self.chunk_seconds,
+        )
+
         vc.start_recording(
-            discord.sinks.WaveSink(),  # The sink type to use.
+            StreamingSink(
+                session_folder,
+                live.feed,
+                self.window_seconds,
+                self.buffer_size,
+                on_start=live.start,
+            ),  # The sink type to use.
             self.once_done,  # What to do once done.
             ctx.channel,  # The channel to disconnect from.
         )
         await ctx.respond("Started recording!")
 
-    async def once_done(self, sink: Sink, channel: discord.TextChannel, *args):
-        recorded_users = [f"<@{user_id}>" for user_id in sink.audio_data.keys()]
-        await sink.vc.disconnect()
+    async def once_done(
+        self, sink: StreamingSink, channel: discord.abc.Messageable, *args
+    ):
+        with PIPELINE_SECONDS.time(stage="disconnect"):
+            await sink.vc.disconnect()
 
-        # Create timestamp for folder name
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        session_folder = os.path.join(self.recordings_dir, f"session_{timestamp}")
-        os.makedirs(session_folder, exist_ok=True)
+        timestamp = os.path.basename(sink.folder).removeprefix("session_")
+        start_offsets = {str(user): offset for user, offset in sink.start_offsets.items()}
+        await asyncio.to_thread(
+            self.queue.set_session_state, timestamp, "transcribing", start_offsets
+        )
+        await self.finish_session(timestamp, channel)
+
+    def _progress_text(self, timestamp: str) -> str:
+        text = "🔄 Processing recordings and transcribing audio..."
+        estimate = self.scheduler.estimate(timestamp)
+        if estimate:
+            position, remaining, eta = estimate
+            where = f"next in queue position {position}" if position else "running now"
+            text += (
+                f"\n⏳ {remaining} chunks left ({where}), "
+                f"ready in about {eta / 60:.0f} min"
+            )
+        return text
+
+    async def _characters(
+        self, guild_id: int | None, voice_channel_id: int | None
+    ) -> dict[int, str]:
+        """Character names by user id, channel-specific over guild-wide"""
+        if guild_id is None:
+            return {}
+        try:
+            mapping = await self.games.get_mapping(guild_id, voice_channel_id)
+        except Exception as e:
+            print(f"Cannot load character names for guild {guild_id}: {e}")
+            return {}
+        return mapping["characters"]
+
+    async def finish_session(
+        self, timestamp: str, channel: discord.abc.Messageable | None = None
+    ):
+        """Wait for a session's jobs, then write, index and post its transcripts
+
+        Runs after every recording, and again on startup for sessions the
+        bot was still working on when it went down.
+        """
+        timer = StageTimer(PIPELINE_SECONDS)
+        session = await asyncio.to_thread(self.queue.get_session, timestamp)
+        session_folder = session["folder"]
+        if channel is None:
+            try:
+                channel = self.bot.get_channel(
+                    session["text_channel_id"]
+                ) or await self.bot.fetch_channel(session["text_channel_id"])
+            except Exception as e:
+                print(f"Cannot post results of session {timestamp}: {e}")
+
+        start_offsets = {
+            int(user): offset
+            for user, offset in json.loads(session["start_offsets"]).items()
+        }
+        # The 16 kHz streams are never renamed, so they list every speaker
+        folder_files = os.listdir(session_folder)
+        user_ids = sorted(
+            (
+                int(f.removesuffix("_16k.f32"))
+                for f in folder_files
+                if f.endswith("_16k.f32")
+            ),
+            key=lambda user_id: start_offsets.get(user_id, 0.0),
+        )
+        recorded_users = [f"<@{user_id}>" for user_id in user_ids]
 
         saved_files = []
-        discord_files = []
+        upload_paths = []
+        archive_tasks = {}
         transcriptions = {}
+        # Participants without a transcript, either way
+        failed = set()
+        no_speech = set()
+        participants = {}
 
-        await channel.send("🔄 Processing recordings and transcribing audio...")
+        # One progress message, edited as the session moves through the stages
+        publisher = SessionPublisher.from_env(channel) if channel is not None else None
+        if publisher is not None:
+            await publisher.progress(self._progress_text(timestamp))
+        timer.lap("announce")
 
-        for user_id, audio in sink.audio_data.items():
-            # Get user info for filename
-            try:
-                user = await self.bot.fetch_user(user_id)
-                username = user.name.replace(" ", "_").replace("/", "_")
-            except:
-                username = f"user_{user_id}"
+        # Every participant's name and character, resolved once for the session
+        names, characters = await asyncio.gather(
+            self.names.resolve(user_ids, self.bot.get_guild(session["guild_id"] or 0)),
+            self._characters(session["guild_id"], session["voice_channel_id"]),
+        )
+        speaker_names = {
+            user_id: speaker_label(
+                names.get(user_id) or f"User {user_id}", characters.get(user_id)
+            )
+            for user_id in user_ids
+        }
+        timer.lap("resolve_names")
+
+        for user_id in user_ids:
+            # Readable, filesystem-safe name for this user's files
+            name = names.get(user_id)
+            username = (
+                name.replace(" ", "_").replace("/", "_") if name else f"user_{user_id}"
+            )
 
-            # Save original WAV file locally
+            # The sink already wrote the WAV file; just give it a readable name
             wav_filename = f"{username}_{user_id}.wav"
             wav_path = os.path.join(session_folder, wav_filename)
+            raw_wav_path = os.path.join(session_folder, f"{user_id}.wav")
+            if os.path.exists(raw_wav_path):
+                if session["state"] == "recording":
+                    # The bot died before the sink could finish this file
+                    repair_wav_header(raw_wav_path)
+                os.replace(raw_wav_path, wav_path)
+            elif not os.path.exists(wav_path):
+                # Re-transcribing a session whose speaker has since been renamed
+                for f in folder_files:
+                    if f.endswith(f"_{user_id}.wav"):
+                        os.replace(os.path.join(session_folder, f), wav_path)
+                        break
 
-            # Reset file pointer and save locally
-            audio.file.seek(0)
-            with open(wav_path, "wb") as f:
-                f.write(audio.file.read())
+            audio_seconds = (
+                os.path.getsize(os.path.join(session_folder, f"{user_id}_16k.f32"))
+                / 4
+                / SAMPLE_RATE
+            )
+            archive = find_archive(folder_files, user_id)
+            has_wav = os.path.exists(wav_path)
+            participants[user_id] = {
+                "user_id": user_id,
+                "name": username,
+                "wav_path": wav_path if has_wav else None,
+                # A WAV removed after archiving still counts at its original size
+                "wav_bytes": os.path.getsize(wav_path)
+                if has_wav
+                else 44 + round(audio_seconds * BYTES_PER_SECOND),
+                "audio_seconds": audio_seconds,
+                "archive_path": os.path.join(session_folder, archive) if archive else None,
+                "archive_bytes": os.path.getsize(os.path.join(session_folder, archive))
+                if archive
+                else 0,
+            }
+            if has_wav and not archive:
+                # Transcode while the transcription finishes
+                archive_tasks[user_id] = asyncio.create_task(
+                    self.archiver.compress(wav_path)
+                )
 
-            saved_files.append(wav_path)
+        timer.lap("prepare_audio")
 
-            discord_files.append(discord.File(wav_path, wav_filename))
+        # Most chunks were transcribed during the session; wait for the rest
+        waiting = asyncio.create_task(self.scheduler.wait_session(timestamp))
+        while publisher is not None and not waiting.done():
+            await publisher.progress(self._progress_text(timestamp))
+            await asyncio.wait({waiting}, timeout=publisher.edit_interval)
+        await waiting
+        results = await asyncio.to_thread(self.queue.session_results, timestamp)
+        timer.lap("transcribe_wait")
 
-            # Transcribe audio using Whisper
-            transcription_text = ""
-            try:
-                await channel.send(f"🎯 Transcribing {username}'s audio...")
-                result = whisper_model.transcribe(wav_path)
-                transcription_text = result["text"]
-                transcriptions[user_id] = transcription_text
-
-                # Save transcription to file
-                transcription_filename = f"{username}_{user_id}_transcription.txt"
-                transcription_path = os.path.join(
-                    session_folder, transcription_filename
-                )
+        for user_id, participant in participants.items():
+            username = participant["name"]
+            result = results.get(user_id, {"text": "", "errors": [], "speech_seconds": 0})
+            participant["speech_seconds"] = result["speech_seconds"]
+            if result["errors"] and not result["text"]:
+                print(f"Error transcribing {username}'s audio: {result['errors'][0]}")
+                transcriptions[user_id] = f"Transcription failed: {result['errors'][0]}"
+                failed.add(user_id)
+                continue
+            if not result["text"]:
+                # Joined but never spoke, or only made sounds Whisper dropped
+                transcriptions[user_id] = "(no speech)"
+                no_speech.add(user_id)
+                continue
 
-                with open(transcription_path, "w", encoding="utf-8") as f:
-                    f.write(f"Transcription for {username} (ID: {user_id})\n")
-                    f.write(f"Session: {timestamp}\n")
-                    f.write("=" * 50 + "\n\n")
-                    f.write(transcription_text)  # type: ignore
+            transcription_text = result["text"]
+            transcriptions[user_id] = transcription_text
 
-                saved_files.append(transcription_path)
+            # Save transcription to file
+            transcription_filename = f"{username}_{user_id}_transcription.txt"
+            transcription_path = os.path.join(session_folder, transcription_filename)
 
-            except Exception as e:
-                print(f"Error transcribing {wav_filename}: {e}")
-                transcriptions[user_id] = f"Transcription failed: {str(e)}"
+            with open(transcription_path, "w", encoding="utf-8") as f:
+                f.write(f"Transcription for {speaker_names[user_id]} (ID: {user_id})\n")
+                f.write(f"Session: {timestamp}\n")
+                f.write(
+                    f"Speech: {participant['speech_seconds']:.0f}s of "
+                    f"{participant['audio_seconds']:.0f}s "
+                    f"({participant['audio_seconds'] - participant['speech_seconds']:.0f}s of silence skipped)\n"
+                )
+                if result.get("models"):
+                    f.write(f"Models: {describe_models(result['models'])}\n")
+                f.write("=" * 50 + "\n\n")
+                f.write(transcription_text)
 
-        # Create combined transcript file
+            saved_files.append(transcription_path)
+            participant["transcript_path"] = transcription_path
+
+        # Each user's stream starts at their first packet; line them up
+        speaker_streams = []
+        for user_id in transcriptions:
+            if user_id in results:
+                speaker_streams.append(
+                    speaker_segments(
+                        results[user_id],
+                        user_id,
+                        speaker_names[user_id],
+                        start_offsets.get(user_id, 0.0),
+                    )
+                )
+        # Create combined transcript file, interleaved in spoken order
         combined_transcript_path = os.path.join(
             session_folder, "combined_transcript.txt"
         )
-        with open(combined_transcript_path, "w", encoding="utf-8") as f:
+        segments_path = os.path.join(session_folder, "segments.jsonl")
+        with open(combined_transcript_path, "w", encoding="utf-8") as f, open(
+            segments_path, "w", encoding="utf-8"
+        ) as segments_file:
             f.write(f"Combined Session Transcript\n")
             f.write(f"Session: {timestamp}\n")
             f.write(f"Participants: {', '.join(recorded_users)}\n")
+            session_models = {}
+            for result in results.values():
+                for name, chunks in result.get("models", {}).items():
+                    session_models[name] = session_models.get(name, 0) + chunks
+            if session_models:
+                f.write(f"Models: {describe_models(session_models)}\n")
             f.write("=" * 50 + "\n\n")
 
-            for user_id, transcription in transcriptions.items():
-                try:
-                    user = await self.bot.fetch_user(user_id)
-                    username = user.name
-                except:
-                    username = f"User {user_id}"
+            write_transcript(merge_segments(speaker_streams), f, segments_file)
 
-                f.write(f"**{username}**:\n")
-                f.write(f"{transcription}\n\n")
+            for user_id, transcription in transcriptions.items():
+                if user_id in failed or user_id in no_speech:
+                    f.write(f"\n{speaker_names[user_id]}: {transcription}\n")
 
+        saved_files.append(segments_path)
         saved_files.append(combined_transcript_path)
+        timer.lap("write_transcripts")
+        if publisher is not None and archive_tasks:
+            await publisher.progress("🗜️ Compressing audio for upload...")
+
+        for user_id, task in archive_tasks.items():
+            participant = participants[user_id]
+            try:
+                archive_path = await task
+            except Exception as e:
+                print(f"Error compressing {participant['wav_path']}: {e}")
+                continue
+            participant["archive_path"] = archive_path
+            participant["archive_bytes"] = os.path.getsize(archive_path)
+            if not os.path.exists(participant["wav_path"]):
+                participant["wav_path"] = None
+        timer.lap("archive_wait")
+
+        for participant in participants.values():
+            # Upload the compressed audio, or the WAV if compressing failed
+            audio_path = participant["archive_path"] or participant["wav_path"]
+            if audio_path:
+                saved_files.append(audio_path)
+                upload_paths.append(audio_path)
+
+        # Record the session in the index so commands never scan the folders
+        try:
+            session_id = await asyncio.to_thread(
+                self.index.add_session,
+                session_folder,
+                session["guild_id"],
+                session["voice_channel_id"],
+                session_started_at(timestamp),
+                max(
+                    (
+                        start_offsets.get(user_id, 0) + participant["audio_seconds"]
+                        for user_id, participant in participants.items()
+                    ),
+                    default=0,
+                ),
+                combined_transcript_path,
+                list(participants.values()),
+            )
+            await asyncio.to_thread(
+                self.index.add_segments_file, session_id, segments_path
+            )
+        except Exception as e:
+            print(f"Error indexing session {timestamp}: {e}")
+
+        await asyncio.to_thread(self.queue.set_session_state, timestamp, "finished")
+        timer.lap("index")
+        SESSIONS_FINISHED.inc()
+        RECORDED_SECONDS.inc(sum(p["audio_seconds"] for p in participants.values()))
+        if publisher is None:
+            SESSION_SECONDS.observe(timer.elapsed)
+            return
 
         # Prepare transcription summary for Discord
         transcript_summary = []
         for user_id, text in transcriptions.items():
-            try:
-                user = await self.bot.fetch_user(user_id)
-                username = user.name
-            except:
-                username = f"User {user_id}"
+            username = speaker_names[user_id]
 
             # Truncate long transcriptions for Discord display
             display_text = text[:200] + "..." if len(text) > 200 else text
             transcript_summary.append(f"**{username}**: {display_text}")
 
-        # Send message with files and transcriptions
-        await channel.send(
-            f"🎙️ Recording completed! Saved locally for: {', '.join(recorded_users)}\n"
-            f"📁 Session folder: `{session_folder}`\n"
-            f"📊 Files saved: {len(saved_files)}\n"
-            f"📝 Transcriptions: {len([t for t in transcriptions.values() if not t.startswith('Transcription')])}/{len(transcriptions)}\n\n"
-            f"**Transcript Preview:**\n" + "\n".join(transcript_summary[:3]),
-            files=discord_files[:10],  # Limit to 10 files for Discord
+        # Participants who never spoke count neither as successes nor failures
+        transcribed = (
+            f"{len(transcriptions) - len(failed) - len(no_speech)}"
+            f"/{len(transcriptions) - len(no_speech)}"
         )
+        if no_speech:
+            transcribed += f" ({len(no_speech)} without speech)"
 
-        # Send the combined transcript as a separate file if it exists
+        # The combined transcript leads, so it travels with the summary
         if os.path.exists(combined_transcript_path):
-            await channel.send(
-                f"📄 **Full combined transcript** for session {timestamp}:",
-                file=discord.File(
-                    combined_transcript_path, f"session_{timestamp}_transcript.txt"
-                ),
+            upload_paths.insert(0, combined_transcript_path)
+        await publisher.progress(f"📤 Uploading {len(upload_paths)} files...")
+
+        # Send message with files and transcriptions, in as many messages as it takes
+        try:
+            too_large, failed_uploads = await publisher.upload(
+                f"🎙️ Recording completed! Saved locally for: {', '.join(recorded_users)}\n"
+                f"📁 Session folder: `{session_folder}`\n"
+                f"📊 Files saved: {len(saved_files)}\n"
+                f"📝 Transcriptions: {transcribed}\n"
+                f"🔇 Silence skipped: {sum(p['audio_seconds'] - p['speech_seconds'] for p in participants.values()) / 60:.1f} of {sum(p['audio_seconds'] for p in participants.values()) / 60:.1f} minutes\n"
+                f"📄 Full combined transcript: `session_{timestamp}_transcript.txt`\n\n"
+                f"**Transcript Preview:**\n" + "\n".join(transcript_summary[:3]),
+                upload_paths,
+                {combined_transcript_path: f"session_{timestamp}_transcript.txt"},
             )
+        except Exception as e:
+            print(f"Error posting results of session {timestamp}: {e}")
+            await publisher.progress(
+                f"❌ Session {timestamp} was transcribed but the results could not be "
+                f"posted; they are in `{session_folder}`"
+            )
+        else:
+            done = f"✅ Session {timestamp} processed in {timer.elapsed:.0f}s"
+            if too_large:
+                done += (
+                    "\n⚠️ Too large to upload, kept in the session folder: "
+                    + ", ".join(f"`{os.path.basename(path)}`" for path in too_large)
+                )
+            if failed_uploads:
+                done += (
+                    "\n⚠️ Upload failed, kept in the session folder: "
+                    + ", ".join(
+                        f"`{os.path.basename(path)}`" for path in failed_uploads
+                    )
+                )
+            await publisher.progress(done)
+        await publisher.flush()
+        timer.lap("publish")
+        SESSION_SECONDS.observe(timer.elapsed)
 
     @discord.slash_command()
     async def stop_recording(self, ctx):
@@ -167,35 +677,46 @@ class Recording(commands.Cog):
             await ctx.respond("I am currently not recording here.")
 
     @discord.slash_command()
-    async def list_recordings(self, ctx: discord.ApplicationContext):
+    async def list_recordings(
+        self,
+        ctx: discord.ApplicationContext,
+        page: discord.Option(int, "Page number", default=1, min_value=1),  # type: ignore
+    ):
         """List all recording sessions"""
-        if not os.path.exists(self.recordings_dir):
-            await ctx.respond("No recordings found.", ephemeral=True)
+        guild_id = ctx.guild.id if ctx.guild else None
+        total = await asyncio.to_thread(self.index.count_sessions, guild_id)
+        if not total:
+            await ctx.respond("No recording sessions found.", ephemeral=True)
             return
 
+        page, pages = self._page(total, page)
+        rows = await asyncio.to_thread(
+            self.index.list_sessions,
+            guild_id,
+            self.page_size,
+            (page - 1) * self.page_size,
+        )
         sessions = []
-        for folder in os.listdir(self.recordings_dir):
-            folder_path = os.path.join(self.recordings_dir, folder)
-            if os.path.isdir(folder_path):
-                files = [f for f in os.listdir(folder_path) if f.endswith((".wav"))]
-                sessions.append(f"📁 `{folder}` - {len(files)} files")
-
-        if not sessions:
-            await ctx.respond("No recording sessions found.", ephemeral=True)
-        else:
-            embed = discord.Embed(
-                title="📋 Recording Sessions",
-                description="\n".join(sessions[:10]),  # Limit to 10 sessions
-                color=discord.Color.blue(),
+        for row in rows:
+            size = f"{row['audio_bytes'] / 1024 / 1024:.1f} MB"
+            if row["archive_bytes"]:
+                size += f" WAV → {row['archive_bytes'] / 1024 / 1024:.1f} MB compressed"
+            sessions.append(
+                f"📁 `session_{row['name']}` - {row['participant_count']} participants, "
+                f"{row['duration'] / 60:.0f} min, {size}"
             )
-            if len(sessions) > 10:
-                embed.set_footer(text=f"...and {len(sessions) - 10} more sessions")
-            await ctx.respond(embed=embed, ephemeral=True)
+
+        embed = discord.Embed(
+            title="📋 Recording Sessions",
+            description="\n".join(sessions),
+            color=discord.Color.blue(),
+        )
+        embed.set_footer(text=f"Page {page}/{pages} - {total} sessions")
+        await ctx.respond(embed=embed, ephemeral=True)
 
     @discord.slash_command()
     async def cleanup_old_recordings(self, ctx: discord.ApplicationContext):
-        """Clean up old recordings (admin only)"""
-        days = 30  # Default to 30 days
+        """Apply this server's retention policy now (admin only)"""
         if (
             not isinstance(ctx.author, discord.Member)
             or not ctx.author.guild_permissions.administrator
@@ -206,107 +727,86 @@ class Recording(commands.Cog):
             return
 
         await ctx.defer(ephemeral=True)
-
-        if not os.path.exists(self.recordings_dir):
-            await ctx.respond("No recordings directory found.", ephemeral=True)
-            return
-
-        import time
-
-        current_time = time.time()
-        cutoff_time = current_time - (days * 24 * 60 * 60)
-
-        deleted_folders = 0
-        deleted_files = 0
-
-        for folder in os.listdir(self.recordings_dir):
-            folder_path = os.path.join(self.recordings_dir, folder)
-            if os.path.isdir(folder_path):
-                folder_time = os.path.getctime(folder_path)
-                if folder_time < cutoff_time:
-                    # Delete folder and all files
-                    for file in os.listdir(folder_path):
-                        file_path = os.path.join(folder_path, file)
-                        if os.path.isfile(file_path):
-                            os.remove(file_path)
-                            deleted_files += 1
-                    os.rmdir(folder_path)
-                    deleted_folders += 1
-
+        report = await self.retention.run({ctx.guild.id})
+        policy = self.retention.policy_for(ctx.guild.id)
         await ctx.respond(
-            f"🧹 Cleanup complete!\n"
-            f"📁 Deleted {deleted_folders} old session folders\n"
-            f"📄 Deleted {deleted_files} files\n"
-            f"📅 Removed recordings older than {days} days",
+            f"🧹 Cleanup complete in {report['seconds']:.1f}s!\n"
+            f"🗜️ Compressed {report['compressed']} recordings\n"
+            f"🗑️ Deleted audio of {report['audio_deleted']} sessions\n"
+            f"💾 Reclaimed {report['bytes_reclaimed'] / 1024 / 1024:.1f} MB\n"
+            f"📅 {describe_policy(policy)}",
             ephemeral=True,
         )
 
     @discord.slash_command()
-    async def list_transcripts(self, ctx: discord.ApplicationContext):
+    async def list_transcripts(
+        self,
+        ctx: discord.ApplicationContext,
+        page: discord.Option(int, "Page number", default=1, min_value=1),  # type: ignore
+    ):
         """List all transcript files"""
-        if not os.path.exists(self.recordings_dir):
-            await ctx.respond("No recordings found.", ephemeral=True)
+        guild_id = ctx.guild.id if ctx.guild else None
+        total = await asyncio.to_thread(
+            self.index.count_sessions, guild_id, transcribed_only=True
+        )
+        if not total:
+            await ctx.respond("No transcript files found.", ephemeral=True)
             return
 
-        transcripts = []
-        for folder in os.listdir(self.recordings_dir):
-            folder_path = os.path.join(self.recordings_dir, folder)
-            if os.path.isdir(folder_path):
-                txt_files = [f for f in os.listdir(folder_path) if f.endswith(".txt")]
-                if txt_files:
-                    transcripts.append(
-                        f"📄 `{folder}` - {len(txt_files)} transcript files"
-                    )
+        page, pages = self._page(total, page)
+        rows = await asyncio.to_thread(
+            self.index.list_sessions,
+            guild_id,
+            self.page_size,
+            (page - 1) * self.page_size,
+            transcribed_only=True,
+        )
+        transcripts = [
+            f"📄 `session_{row['name']}` - {row['participant_count']} speakers"
+            for row in rows
+        ]
 
-        if not transcripts:
-            await ctx.respond("No transcript files found.", ephemeral=True)
-        else:
-            embed = discord.Embed(
-                title="📝 Transcript Files",
-                description="\n".join(transcripts[:10]),  # Limit to 10 sessions
-                color=discord.Color.green(),
-            )
-            if len(transcripts) > 10:
-                embed.set_footer(
-                    text=f"...and {len(transcripts) - 10} more transcript sessions"
-                )
-            await ctx.respond(embed=embed, ephemeral=True)
+        embed = discord.Embed(
+            title="📝 Transcript Files",
+            description="\n".join(transcripts),
+            color=discord.Color.green(),
+        )
+        embed.set_footer(text=f"Page {page}/{pages} - {total} transcript sessions")
+        await ctx.respond(embed=embed, ephemeral=True)
 
     @discord.slash_command()
     async def get_transcript(self, ctx: discord.ApplicationContext, session: str):
         """Get transcript from a specific session"""
-        if not os.path.exists(self.recordings_dir):
-            await ctx.respond("No recordings found.", ephemeral=True)
-            return
-
-        # Find the session folder
-        session_folder = None
-        for folder in os.listdir(self.recordings_dir):
-            if session in folder:  # Allow partial match for convenience
-                session_folder = os.path.join(self.recordings_dir, folder)
-                break
-
-        if not session_folder or not os.path.exists(session_folder):
+        # Exact name or prefix of the session timestamp, newest first
+        row = await asyncio.to_thread(
+            self.index.find_session, ctx.guild.id if ctx.guild else None, session
+        )
+        if row is None:
             await ctx.respond(f"Session '{session}' not found.", ephemeral=True)
             return
 
-        # Look for combined transcript first
-        combined_transcript = os.path.join(session_folder, "combined_transcript.txt")
-        if os.path.exists(combined_transcript):
+        session_name = f"session_{row['name']}"
+        combined_transcript = row["transcript_path"]
+        if combined_transcript and os.path.exists(combined_transcript):
             await ctx.respond(
-                f"📄 **Combined transcript** for session {os.path.basename(session_folder)}:",
+                f"📄 **Combined transcript** for session {session_name}:",
                 file=discord.File(
                     combined_transcript,
-                    f"combined_transcript_{os.path.basename(session_folder)}.txt",
+                    f"combined_transcript_{session_name}.txt",
                 ),
                 ephemeral=True,
             )
         else:
             # List individual transcripts
-            txt_files = [f for f in os.listdir(session_folder) if f.endswith(".txt")]
+            participants = await asyncio.to_thread(self.index.participants, row["id"])
+            txt_files = [
+                os.path.basename(p["transcript_path"])
+                for p in participants
+                if p["transcript_path"]
+            ]
             if txt_files:
                 await ctx.respond(
-                    f"📝 Found {len(txt_files)} transcript files in session {os.path.basename(session_folder)}:\n"
+                    f"📝 Found {len(txt_files)} transcript files in session {session_name}:\n"
                     + "\n".join(f"• {f}" for f in txt_files),
                     ephemeral=True,
                 )
@@ -315,27 +815,275 @@ class Recording(commands.Cog):
                     f"No transcript files found in session {session}.", ephemeral=True
                 )
 
+    @discord.slash_command()
+    async def retranscribe(
+        self,
+        ctx: discord.ApplicationContext,
+        session: str,
+        model: discord.Option(str, "Whisper model", choices=list(DEFAULT_COST), default=None),  # type: ignore
+    ):
+        """Transcribe a recorded session again, optionally with another model (admin only)"""
+        if (
+            not isinstance(ctx.author, discord.Member)
+            or not ctx.author.guild_permissions.administrator
+        ):
+            await ctx.respond(
+                "❌ You need admin permissions to use this command.", ephemeral=True
+            )
+            return
+
+        guild_id = ctx.guild.id if ctx.guild else None
+        row = await asyncio.to_thread(self.index.find_session, guild_id, session)
+        if row is None:
+            await ctx.respond(f"Session '{session}' not found.", ephemeral=True)
+            return
+
+        name = row["name"]
+        folder = row["folder"]
+        try:
+            streams = [f for f in os.listdir(folder) if f.endswith("_16k.f32")]
+        except FileNotFoundError:
+            await ctx.respond(
+                f"The audio of session `session_{name}` has been deleted.",
+                ephemeral=True,
+            )
+            return
+        if not streams:
+            await ctx.respond(
+                f"Session `session_{name}` was recorded before 16 kHz audio was kept "
+                "and cannot be re-transcribed.",
+                ephemeral=True,
+            )
+            return
+        if name in self.scheduler.outstanding:
+            await ctx.respond(
+                f"Session `session_{name}` is already being transcribed.", ephemeral=True
+            )
+            return
+
+        model_name = model or self.transcriber.model_for(guild_id)
+        if await asyncio.to_thread(self.queue.get_session, name) is None:
+            await asyncio.to_thread(
+                self.queue.add_session,
+                name,
+                folder,
+                guild_id,
+                ctx.channel.id,
+                row["channel_id"],
+                model_name,
+            )
+        # An explicitly requested model is kept even under the tier policy
+        pinned = model is not None
+        jobs = await asyncio.to_thread(
+            self.queue.requeue_session, name, model_name, pinned
+        )
+        if jobs:
+            for job in jobs:
+                self.scheduler.register(job)
+        else:
+            # No chunk layout on record; cut each stream from scratch
+            live = LiveTranscription(
+                self.scheduler,
+                name,
+                folder,
+                row["guild_id"],
+                model_name,
+                asyncio.get_running_loop(),
+                self.chunk_seconds,
+                pinned,
+            )
+            for stream in streams:
+                samples = await asyncio.to_thread(
+                    np.fromfile, os.path.join(folder, stream), np.float32
+                )
+                await asyncio.to_thread(
+                    live.feed, int(stream.removesuffix("_16k.f32")), 0, 0.0, samples
+                )
+
+        await ctx.respond(
+            f"🔁 Re-transcribing `session_{name}` with the '{model_name}' model; "
+            "chunks it has already seen come from the cache."
+        )
+        # Anything that cannot take messages falls back to the session's own channel
+        channel = ctx.channel
+        if not isinstance(channel, discord.abc.Messageable):
+            channel = None
+        await self.finish_session(name, channel)
+
+    @discord.slash_command()
+    async def search_transcript(self, ctx: discord.ApplicationContext, query: str):
+        """Search every transcript in this server for a phrase"""
+        hits = await asyncio.to_thread(
+            self.index.search, ctx.guild.id if ctx.guild else None, query
+        )
+        if not hits:
+            await ctx.respond(f"No transcript lines match '{query}'.", ephemeral=True)
+            return
+
+        results = [
+            f"`session_{hit['session']}` [{format_timestamp(hit['start_ms'] / 1000)}] "
+            f"({hit['start_ms']} ms) **{hit['speaker']}**: {hit['snippet']}"
+            for hit in hits
+        ]
+        # Embed titles are capped at 256 characters
+        shown = query if len(query) <= 200 else query[:199] + "…"
+        embed = discord.Embed(
+            title=f"🔎 Transcript matches for '{shown}'",
+            description="\n".join(results)[:4096],
+            color=discord.Color.green(),
+        )
+        await ctx.respond(embed=embed, ephemeral=True)
+
+    @discord.slash_command()
+    async def transcription_queue(self, ctx: discord.ApplicationContext):
+        """Show where this server's sessions are in the transcription queue"""
+        sessions = self.scheduler.guild_sessions(ctx.guild.id if ctx.guild else None)
+        if not sessions:
+            await ctx.respond(
+                "✅ Nothing from this server is waiting for transcription.",
+                ephemeral=True,
+            )
+            return
+
+        lines = []
+        for session in sessions:
+            estimate = self.scheduler.estimate(session)
+            if estimate:
+                position, remaining, eta = estimate
+                where = f"position {position}" if position else "running now"
+                lines.append(
+                    f"🎙️ `session_{session}` - {remaining} chunks left, {where}, "
+                    f"ETA ~{eta / 60:.0f} min"
+                )
+
+        embed = discord.Embed(
+            title="📥 Transcription Queue",
+            description="\n".join(lines),
+            color=discord.Color.blue(),
+        )
+        embed.set_footer(
+            text=f"{self.scheduler.depth()} chunks queued across all servers"
+        )
+        await ctx.respond(embed=embed, ephemeral=True)
+
     @discord.slash_command()
     async def transcription_status(self, ctx: discord.ApplicationContext):
         """Check transcription system status"""
+        # Asking the workers what they have loaded can take a moment
+        await ctx.defer(ephemeral=True)
         embed = discord.Embed(
             title="🔍 Transcription System Status", color=discord.Color.blue()
         )
 
+        model_name = self.transcriber.model_for(ctx.guild.id if ctx.guild else None)
+        await self.transcriber.refresh_status()
+        loaded = self.transcriber.status()
+        workers = self.transcriber.workers
+        if model_name in self.transcriber.warming:
+            whisper_status = f"⏳ Warming up '{model_name}' model"
+        elif loaded.get(model_name):
+            whisper_status = f"✅ Loaded '{model_name}' model in {loaded[model_name]}/{workers} workers"
+        else:
+            whisper_status = f"💤 '{model_name}' model loads on first use"
+        if model_name in self.transcriber.load_times:
+            whisper_status += (
+                f" (load time {self.transcriber.load_times[model_name]:.1f}s)"
+            )
+        if self.transcriber.backend:
+            whisper_status += f"\nBackend: {self.transcriber.backend}"
+        other_models = [name for name in loaded if name != model_name]
+        if other_models:
+            whisper_status += f"\nAlso loaded: {', '.join(other_models)}"
+
         embed.add_field(
             name="🎯 Whisper AI",
-            value="✅ Available - Using 'base' model",
+            value=whisper_status,
+            inline=False,
+        )
+
+        policy = self.scheduler.policy
+        if policy is not None:
+            top_tier = policy.tiers[-1]
+            below = await asyncio.to_thread(self.queue.sessions_below, top_tier)
+            guild_id = ctx.guild.id if ctx.guild else None
+            below = [row for row in below if row["guild_id"] == guild_id]
+            tiers_status = " → ".join(
+                f"{tier} ({policy.cost[tier]:.2f}s/s)" for tier in policy.tiers
+            )
+            tiers_status += f"\nTarget latency {policy.target_latency / 60:.0f} min"
+            if below:
+                tiers_status += (
+                    f"\n{len(below)} sessions have chunks below '{top_tier}'; "
+                    f"upgrade with /retranscribe (e.g. `{below[-1]['name']}`)"
+                )
+            embed.add_field(name="🎚️ Model Tiers", value=tiers_status, inline=False)
+
+        report = self.retention.last_report
+        if report:
+            retention_status = (
+                f"Last run {datetime.fromtimestamp(report['finished_at']):%Y-%m-%d %H:%M} "
+                f"in {report['seconds']:.1f}s: reclaimed "
+                f"{report['bytes_reclaimed'] / 1024 / 1024:.1f} MB, "
+                f"{report['compressed']} compressed, {report['audio_deleted']} deleted"
+            )
+            if report["errors"]:
+                retention_status += f", {report['errors']} errors"
+        else:
+            retention_status = "⏳ First run pending"
+        retention_policy = self.retention.policy_for(ctx.guild.id if ctx.guild else None)
+        embed.add_field(
+            name="🧹 Retention",
+            value=f"{retention_status}\n{describe_policy(retention_policy)}",
+            inline=False,
+        )
+
+        cache = self.cache.stats()
+        embed.add_field(
+            name="🗃️ Transcript Cache",
+            value=f"{cache['entries']} chunks, {cache['bytes'] / (1024 * 1024):.1f} MB "
+            f"of {self.cache.max_bytes / (1024 * 1024):.0f} MB, "
+            f"{cache['hits']} hits / {cache['misses']} misses",
+            inline=True,
+        )
+
+        embed.add_field(
+            name="📥 Queue",
+            value=f"{len(self.scheduler.running)} running, "
+            f"{len(self.scheduler.pending)} waiting "
+            f"(~{self.scheduler.batch_seconds:.1f}s per batch of up to "
+            f"{self.scheduler.batch_size})",
+            inline=True,
+        )
+
+        stages = [
+            f"{stage}: {describe_histogram(PIPELINE_SECONDS, stage=stage)}"
+            for stage in STAGES
+            if PIPELINE_SECONDS.count(stage=stage)
+        ]
+        if stages:
+            stages.append(f"**total: {describe_histogram(SESSION_SECONDS)}**")
+        embed.add_field(
+            name="⏱️ Pipeline Stages (since restart)",
+            value="\n".join(stages) or "No session finished yet",
+            inline=False,
+        )
+
+        rtf = real_time_factor()
+        audio_hours = TRANSCRIBED_SECONDS.value() / 3600
+        embed.add_field(
+            name="📈 Throughput",
+            value=f"{audio_hours:.2f} h of speech transcribed"
+            + (f" at {rtf:.3f}× real time" if rtf is not None else "")
+            + f"\n{RECORDED_SECONDS.value() / 3600:.2f} h recorded in "
+            f"{SESSIONS_FINISHED.value():.0f} sessions\n"
+            f"Bot memory {rss_bytes() / 1024 / 1024:.0f} MB",
             inline=False,
         )
 
         # Recordings directory status
         if os.path.exists(self.recordings_dir):
-            session_count = len(
-                [
-                    f
-                    for f in os.listdir(self.recordings_dir)
-                    if os.path.isdir(os.path.join(self.recordings_dir, f))
-                ]
+            session_count = await asyncio.to_thread(
+                self.index.count_sessions, ctx.guild.id if ctx.guild else None
             )
             embed.add_field(
                 name="📁 Recordings Directory",
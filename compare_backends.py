@@ -0,0 +1,122 @@
+"""Compare transcription backends on real recordings: speed and word error rate
+
+The first backend is the reference; the word error rate of every other
+backend is measured against its output on the same speech chunks.
+
+Usage: python compare_backends.py [--model base] [--backends whisper,whisper-int8]
+                                  [--limit 40] session [session ...]
+
+Sessions are folder paths or names under recordings/ (e.g. 20240101_200000).
+"""
+
+import argparse
+import glob
+import os
+import re
+import time
+import numpy as np
+from dotenv import load_dotenv
+from services.audio import SAMPLE_RATE, detect_speech, plan_chunks
+from services.backends import BACKENDS, get_backend
+
+
+def _words(text: str) -> list[str]:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference: str, hypothesis: str) -> tuple[int, int]:
+    """Word-level edit distance and reference length"""
+    ref = _words(reference)
+    hyp = _words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (ref_word != hyp_word),
+                )
+            )
+        previous = current
+    return previous[-1], len(ref)
+
+
+def load_chunks(folders: list[str], limit: int, chunk_seconds: float) -> list[np.ndarray]:
+    """Speech chunks cut exactly as live transcription would cut them"""
+    chunks = []
+    for folder in folders:
+        for path in sorted(glob.glob(os.path.join(folder, "*_16k.f32"))):
+            samples = np.memmap(path, dtype=np.float32, mode="r")
+            for ranges in plan_chunks(
+                samples, detect_speech(samples), int(chunk_seconds * SAMPLE_RATE)
+            ):
+                chunks.append(
+                    np.concatenate([np.array(samples[start:end]) for start, end in ranges])
+                )
+                if len(chunks) >= limit:
+                    return chunks
+    return chunks
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sessions", nargs="+")
+    parser.add_argument("--model", default=os.getenv("WHISPER_MODEL", "base"))
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--limit", type=int, default=40, help="speech chunks to compare")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--recordings-dir", default="recordings")
+    args = parser.parse_args()
+
+    folders = [
+        session
+        if os.path.isdir(session)
+        else os.path.join(args.recordings_dir, f"session_{session}")
+        for session in args.sessions
+    ]
+    chunks = load_chunks(
+        folders, args.limit, float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "30"))
+    )
+    if not chunks:
+        print("No speech found in the given sessions")
+        return
+    audio_seconds = sum(len(chunk) for chunk in chunks) / SAMPLE_RATE
+    print(f"{len(chunks)} chunks, {audio_seconds:.1f}s of speech, model '{args.model}'")
+
+    reference = None
+    for name in args.backends.split(","):
+        backend = get_backend(name.strip())
+        started = time.perf_counter()
+        model = backend.load(args.model)
+        load_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        texts = []
+        for i in range(0, len(chunks), args.batch_size):
+            results = backend.transcribe_batch(model, chunks[i : i + args.batch_size])
+            texts.extend(result["text"].strip() for result in results)
+        elapsed = time.perf_counter() - started
+
+        line = (
+            f"{backend.name:>14}: load {load_time:.1f}s, transcribe {elapsed:.1f}s,"
+            f" {audio_seconds / elapsed:.1f}x real time"
+        )
+        if reference is None:
+            reference = texts
+            line += " (reference)"
+        else:
+            errors = words = 0
+            for ref_text, text in zip(reference, texts):
+                chunk_errors, chunk_words = word_errors(ref_text, text)
+                errors += chunk_errors
+                words += chunk_words
+            line += f", WER {errors / max(words, 1):.1%} vs reference"
+        print(line)
+        del model
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,28 @@
 from discord.ext import commands
 import os
 from dotenv import load_dotenv
+from services.game_service import GameService
 
 load_dotenv()
-bot = commands.Bot()
 
-cogs_list = ["recording", "admin"]
 
-for cog in cogs_list:
-    bot.load_extension(f"cogs.{cog}")
+class Bot(commands.Bot):
+    """The bot, holding the services every cog shares"""
+
+    def __init__(self):
+        super().__init__()
+        # One write-back cache for every cog, so none serves stale characters
+        self.games = GameService.from_env()
+
+    async def close(self):
+        await super().close()
+        # py-cord does not unload cogs on close, so their pending writes go here
+        self.games.close()
+
+
+bot = Bot()
+
+cogs_list = ["recording", "admin"]
 
 
 @bot.event
@@ -16,4 +30,9 @@ async def on_ready():
     print(f"{bot.user} is ready and online!")
 
 
-bot.run(os.getenv("TOKEN"))
+# Guarded so transcription worker processes can import this module safely
+if __name__ == "__main__":
+    for cog in cogs_list:
+        bot.load_extension(f"cogs.{cog}")
+
+    bot.run(os.getenv("TOKEN"))
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import time
+from services.metrics import metrics
+
+# ffmpeg output options per archival codec; recordings are voice, so Opus
+# in VoIP mode at a low bitrate stays transparent while FLAC is lossless
+CODECS = {
+    "opus": (".ogg", ["-c:a", "libopus", "-application", "voip"]),
+    "flac": (".flac", ["-c:a", "flac", "-compression_level", "8"]),
+}
+ARCHIVE_EXTENSIONS = tuple(extension for extension, _ in CODECS.values())
+ENCODE_SECONDS = metrics.histogram(
+    "archive_encode_seconds", "Wall time of each ffmpeg transcode, by codec and outcome"
+)
+
+
+class ArchiveEncoder:
+    """Transcodes finished WAV recordings with ffmpeg in child processes
+
+    Each file is a separate ``ffmpeg`` process awaited with asyncio, so the
+    event loop never waits on it; ``concurrency`` caps how many run at once.
+    Output goes to a temporary name and is renamed into place, so a crash
+    never leaves a truncated archive next to the original. Originals are
+    kept by default; the retention compress tier removes them once they
+    are old enough, so a lossy archive is not the only copy from day one.
+    """
+
+    def __init__(
+        self,
+        codec: str = "opus",
+        bitrate: str = "32k",
+        concurrency: int = 2,
+        keep_originals: bool = True,
+    ):
+        if codec not in CODECS:
+            raise ValueError(
+                f"Unknown archive codec {codec!r}, expected one of {', '.join(CODECS)}"
+            )
+        self.codec = codec
+        self.bitrate = bitrate
+        self.keep_originals = keep_originals
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    @classmethod
+    def from_env(cls) -> "ArchiveEncoder":
+        return cls(
+            codec=os.getenv("ARCHIVE_CODEC", "opus"),
+            bitrate=os.getenv("ARCHIVE_BITRATE", "32k"),
+            concurrency=int(os.getenv("ARCHIVE_CONCURRENCY", "2")),
+            keep_originals=os.getenv("ARCHIVE_KEEP_ORIGINALS", "true").lower() == "true",
+        )
+
+    @property
+    def extension(self) -> str:
+        return CODECS[self.codec][0]
+
+    async def compress(self, wav_path: str) -> str:
+        """Transcode one WAV file and return the archive's path"""
+        extension, options = CODECS[self.codec]
+        archive_path = os.path.splitext(wav_path)[0] + extension
+        partial_path = archive_path + ".part"
+        if self.codec == "opus":
+            options = [*options, "-b:a", self.bitrate]
+
+        async with self.semaphore:
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                "ffmpeg",
+                "-nostdin",
+                "-loglevel",
+                "error",
+                "-y",
+                "-i",
+                wav_path,
+                *options,
+                "-f",
+                "ogg" if self.codec == "opus" else self.codec,
+                partial_path,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, stderr = await process.communicate()
+            ENCODE_SECONDS.observe(
+                time.perf_counter() - started,
+                codec=self.codec,
+                outcome="ok" if process.returncode == 0 else "error",
+            )
+
+        if process.returncode != 0:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise RuntimeError(
+                f"ffmpeg failed on {wav_path}: {stderr.decode(errors='replace').strip()}"
+            )
+        os.replace(partial_path, archive_path)
+        if not self.keep_originals:
+            os.remove(wav_path)
+        return archive_path
+
+
+def find_archive(folder_files: list[str], user_id: int) -> str | None:
+    """Name of an existing archive of a user's audio, in any codec"""
+    for name in folder_files:
+        stem, extension = os.path.splitext(name)
+        if extension in ARCHIVE_EXTENSIONS and stem.endswith(f"_{user_id}"):
+            return name
+    return None
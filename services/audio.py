@@ -0,0 +1,138 @@
+import numpy as np
+
+# Whisper works on 16 kHz mono float32; Discord delivers 48 kHz stereo s16le
+SAMPLE_RATE = 16000
+CAPTURE_RATE = 48000
+DECIMATION = CAPTURE_RATE // SAMPLE_RATE
+
+
+def _lowpass_taps(num_taps: int = 63) -> np.ndarray:
+    """Windowed-sinc anti-aliasing filter just below the 8 kHz output Nyquist"""
+    cutoff = 0.9 * (SAMPLE_RATE / 2) / CAPTURE_RATE
+    n = np.arange(num_taps) - (num_taps - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(num_taps)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+class Downsampler:
+    """Incrementally converts Discord PCM chunks into Whisper's 16 kHz mono float32
+
+    Filter history and decimation phase carry over between calls, so feeding
+    a stream in arbitrary chunks gives the same result as converting it whole.
+    """
+
+    def __init__(self, num_taps: int = 63):
+        self.taps = _lowpass_taps(num_taps)[::-1].copy()
+        self.history = np.zeros(num_taps - 1, dtype=np.float32)
+        self.phase = 0
+
+    def process(self, pcm: bytes) -> np.ndarray:
+        stereo = np.frombuffer(pcm, dtype="<i2").reshape(-1, 2)
+        mono = stereo.mean(axis=1, dtype=np.float32) / 32768.0
+        if not len(mono):
+            return mono
+
+        signal = np.concatenate([self.history, mono])
+        # Only evaluate the filter at the samples that survive decimation
+        frames = np.lib.stride_tricks.sliding_window_view(signal, len(self.taps))
+        out = frames[self.phase :: DECIMATION] @ self.taps
+
+        self.phase = (self.phase - len(mono)) % DECIMATION
+        self.history = signal[len(signal) - len(self.history) :]
+        return out.astype(np.float32, copy=False)
+
+
+def detect_speech(
+    samples: np.ndarray,
+    frame_ms: int = 30,
+    threshold_db: float = 12.0,
+    floor_db: float = -55.0,
+    noise_ceiling_db: float = -45.0,
+    min_speech: float = 0.25,
+    min_silence: float = 0.6,
+    padding: float = 0.2,
+) -> list[tuple[int, int]]:
+    """Find speech in 16 kHz mono samples by frame energy
+
+    A frame counts as speech when it is ``threshold_db`` above the estimated
+    noise floor and louder than ``floor_db``. The floor estimate is capped at
+    ``noise_ceiling_db`` so a window of nonstop talking is not mistaken for
+    background noise. Gaps shorter than
+    ``min_silence`` are bridged, blips shorter than ``min_speech`` dropped,
+    and every region is padded. Returns ``(start, end)`` sample indices.
+    """
+    frame = SAMPLE_RATE * frame_ms // 1000
+    count = len(samples) // frame
+    if not count:
+        return []
+
+    frames = samples[: count * frame].reshape(count, frame)
+    energy = np.mean(np.square(frames, dtype=np.float64), axis=1)
+    level = 10 * np.log10(energy + 1e-12)
+    noise = min(np.percentile(level, 10), noise_ceiling_db)
+    speech = level > max(noise + threshold_db, floor_db)
+
+    # Run boundaries: +1 where speech starts, -1 where it stops
+    edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if not len(starts):
+        return []
+
+    # Bridge short pauses inside a sentence
+    gaps = starts[1:] - ends[:-1]
+    keep = gaps * frame_ms / 1000 >= min_silence
+    starts = np.concatenate((starts[:1], starts[1:][keep]))
+    ends = np.concatenate((ends[:-1][keep], ends[-1:]))
+
+    long_enough = (ends - starts) * frame_ms / 1000 >= min_speech
+    pad = int(padding * SAMPLE_RATE)
+    return [
+        (max(0, int(start) * frame - pad), min(len(samples), int(end) * frame + pad))
+        for start, end in zip(starts[long_enough], ends[long_enough])
+    ]
+
+
+def quietest_point(samples: np.ndarray, start: int, end: int, frame_ms: int = 30) -> int:
+    """Sample index of the quietest frame in ``samples[start:end]``, a good place to cut"""
+    frame = SAMPLE_RATE * frame_ms // 1000
+    count = (end - start) // frame
+    if count < 2:
+        return end
+    frames = samples[start : start + count * frame].reshape(count, frame)
+    energy = np.mean(np.square(frames, dtype=np.float64), axis=1)
+    # Cut in the middle of the quietest frame
+    return start + int(np.argmin(energy)) * frame + frame // 2
+
+
+def plan_chunks(
+    samples: np.ndarray, regions: list[tuple[int, int]], max_samples: int
+) -> list[list[tuple[int, int]]]:
+    """Pack speech regions into chunks of at most ``max_samples`` of speech
+
+    Consecutive regions share a chunk until it is full; a region longer than
+    a whole chunk is split at its quietest points. Each chunk is a list of
+    ``(start, end)`` sample ranges in track order.
+    """
+    pieces = []
+    for start, end in regions:
+        while end - start > max_samples:
+            # Look for a pause in the back half of the allowed span
+            cut = quietest_point(samples, start + max_samples // 2, start + max_samples)
+            pieces.append((start, cut))
+            start = cut
+        pieces.append((start, end))
+
+    chunks = []
+    current = []
+    size = 0
+    for start, end in pieces:
+        if current and size + (end - start) > max_samples:
+            chunks.append(current)
+            current = []
+            size = 0
+        current.append((start, end))
+        size += end - start
+    if current:
+        chunks.append(current)
+    return chunks
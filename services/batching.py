@@ -0,0 +1,116 @@
+import numpy as np
+from services.audio import SAMPLE_RATE
+
+# Whisper decodes one 30 s window of 20 ms timestamp steps at a time
+WINDOW_SAMPLES = 30 * SAMPLE_RATE
+TIME_PRECISION = 0.02
+
+# The same quality gates model.transcribe uses before retrying at a higher temperature
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+# Everything about decoding that changes the output, for cache keys
+DECODING_OPTIONS = {
+    "task": "transcribe",
+    "temperature": 0.0,
+    "timestamps": True,
+    "compression_ratio_threshold": COMPRESSION_RATIO_THRESHOLD,
+    "logprob_threshold": LOGPROB_THRESHOLD,
+    "no_speech_threshold": NO_SPEECH_THRESHOLD,
+}
+
+
+def _timestamp_segments(tokens: list[int], tokenizer, duration: float) -> list[dict]:
+    """Split decoded tokens into segments at Whisper's timestamp tokens"""
+    segments = []
+    start = None
+    text_tokens = []
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            time = (token - tokenizer.timestamp_begin) * TIME_PRECISION
+            if start is not None and text_tokens:
+                segments.append(
+                    {
+                        "start": start,
+                        "end": min(time, duration),
+                        "text": tokenizer.decode(text_tokens),
+                    }
+                )
+                text_tokens = []
+                start = None
+            else:
+                start = time
+        elif token < tokenizer.eot:
+            if start is None:
+                start = 0.0
+            text_tokens.append(token)
+    if text_tokens:
+        segments.append(
+            {
+                "start": start or 0.0,
+                "end": duration,
+                "text": tokenizer.decode(text_tokens),
+            }
+        )
+    return segments
+
+
+def transcribe_batch(model, batch: list[np.ndarray]) -> list[dict]:
+    """Transcribe several 16 kHz float32 chunks with one encoder and decoder pass
+
+    Chunks that fit in a single 30 s window are padded, stacked into one mel
+    batch and decoded together at temperature 0. Longer chunks, and any whose
+    output fails Whisper's usual quality checks, go through
+    ``model.transcribe`` on their own so nothing loses its fallback.
+    """
+    import torch
+    import whisper
+    from whisper.tokenizer import get_tokenizer
+
+    results: list[dict | None] = [None] * len(batch)
+    fits = [i for i, samples in enumerate(batch) if len(samples) <= WINDOW_SAMPLES]
+
+    if fits:
+        mel = torch.stack(
+            [
+                whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(
+                        torch.from_numpy(np.ascontiguousarray(batch[i], dtype=np.float32))
+                    ),
+                    model.dims.n_mels,
+                )
+                for i in fits
+            ]
+        ).to(model.device)
+        options = whisper.DecodingOptions(
+            task="transcribe",
+            without_timestamps=False,
+            fp16=model.device.type == "cuda",
+        )
+        decoded = whisper.decode(model, mel, options)
+        tokenizer = get_tokenizer(
+            model.is_multilingual, num_languages=model.num_languages, task="transcribe"
+        )
+
+        for i, result in zip(fits, decoded):
+            if (
+                result.no_speech_prob > NO_SPEECH_THRESHOLD
+                and result.avg_logprob < LOGPROB_THRESHOLD
+            ):
+                results[i] = {"text": "", "segments": [], "language": result.language}
+            elif (
+                result.compression_ratio <= COMPRESSION_RATIO_THRESHOLD
+                and result.avg_logprob >= LOGPROB_THRESHOLD
+            ):
+                duration = len(batch[i]) / SAMPLE_RATE
+                results[i] = {
+                    "text": result.text,
+                    "segments": _timestamp_segments(result.tokens, tokenizer, duration),
+                    "language": result.language,
+                }
+
+    for i, result in enumerate(results):
+        if result is None:
+            results[i] = model.transcribe(batch[i])
+    return results  # type: ignore
@@ -1,47 +1,201 @@
-from sqlitedict import SqliteDict
+import asyncio
+import os
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    guild_id INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    game_name TEXT,
+    PRIMARY KEY (guild_id, channel)
+);
+
+CREATE TABLE IF NOT EXISTS characters (
+    guild_id INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    character TEXT NOT NULL,
+    PRIMARY KEY (guild_id, channel, user_id)
+);
+"""
+
+# Settings made without a channel apply to the whole guild
+GUILD_WIDE = "*"
+
+
+def _channel(channel_id: int | None) -> str:
+    return str(channel_id) if channel_id is not None else GUILD_WIDE
 
 
 class GameService:
-    def __init__(self, db_path="game_database.sqlite"):
-        self.db = SqliteDict(db_path, autocommit=True)
+    """Game names and player characters per guild, optionally per voice channel
+
+    Reads are served from memory once a (guild, channel) scope has been
+    loaded; writes land in memory at once and reach SQLite in batches
+    ``flush_delay`` seconds later. A channel lookup falls back to the
+    guild-wide '*' scope, and both are loaded by the same query. The bot
+    holds the one instance every cog uses, so no cog serves stale scopes.
+    """
 
-    def _key(self, guild_id: int, channel_id: int | None) -> str:
-        return f"g:{guild_id}:vc:{channel_id if channel_id is not None else '*'}"
+    def __init__(self, db_path: str = "game_database.sqlite", flush_delay: float = 2.0):
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.flush_delay = flush_delay
+        # (guild_id, channel) -> {"game_name": str | None, "characters": {user_id: name}}
+        self.scopes: dict[tuple[int, str], dict] = {}
+        self.dirty_games: dict[tuple[int, str], str] = {}
+        self.dirty_characters: dict[tuple[int, str, int], str] = {}
+        self.flush_task: asyncio.Task | None = None
+        self.closed = False
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.executescript(SCHEMA)
+            self._migrate()
 
-    def _load(self, guild_id: int, channel_id: int | None) -> dict:
-        return self.db.get(
-            self._key(guild_id, channel_id), {"game_name": None, "characters": {}}
-        )
+    @classmethod
+    def from_env(cls) -> "GameService":
+        return cls(os.getenv("GAME_DB_PATH", "game_database.sqlite"))
 
-    def _save(self, guild_id: int, channel_id: int | None, cfg: dict) -> None:
-        self.db[self._key(guild_id, channel_id)] = cfg
+    def _migrate(self) -> None:
+        """Move pickled configs from the old SqliteDict table into the new tables"""
+        exists = self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'unnamed'"
+        ).fetchone()
+        if not exists:
+            return
+        from sqlitedict import decode
 
-    def set_game(self, guild_id: int, name: str, channel_id: int | None = None) -> None:
-        cfg = self._load(guild_id, channel_id)
-        cfg["game_name"] = name.strip()
-        self._save(guild_id, channel_id, cfg)
+        for key, value in self.db.execute("SELECT key, value FROM unnamed").fetchall():
+            _, guild_id, _, channel = key.split(":", 3)
+            config = decode(value)
+            if config.get("game_name") is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO games VALUES (?, ?, ?)",
+                    (int(guild_id), channel, config["game_name"]),
+                )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO characters VALUES (?, ?, ?, ?)",
+                [
+                    (int(guild_id), channel, int(user_id), character)
+                    for user_id, character in config.get("characters", {}).items()
+                ],
+            )
+        self.db.execute("ALTER TABLE unnamed RENAME TO unnamed_migrated")
 
-    def set_character(
+    def _load(self, guild_id: int, channel: str) -> dict[tuple[int, str], dict]:
+        """Read a channel scope and the guild-wide scope together"""
+        channels = (channel, GUILD_WIDE)
+        scopes = {
+            (guild_id, c): {"game_name": None, "characters": {}} for c in channels
+        }
+        with self.lock:
+            for c, game_name in self.db.execute(
+                "SELECT channel, game_name FROM games"
+                " WHERE guild_id = ? AND channel IN (?, ?)",
+                (guild_id, *channels),
+            ):
+                scopes[(guild_id, c)]["game_name"] = game_name
+            for c, user_id, character in self.db.execute(
+                "SELECT channel, user_id, character FROM characters"
+                " WHERE guild_id = ? AND channel IN (?, ?)",
+                (guild_id, *channels),
+            ):
+                scopes[(guild_id, c)]["characters"][user_id] = character
+        return scopes
+
+    async def _scopes(self, guild_id: int, channel_id: int | None) -> tuple[dict, dict]:
+        """The channel's own scope and the guild-wide one, loading them if needed"""
+        channel = _channel(channel_id)
+        keys = [(guild_id, channel), (guild_id, GUILD_WIDE)]
+        if any(key not in self.scopes for key in keys):
+            loaded = await asyncio.to_thread(self._load, guild_id, channel)
+            for key, scope in loaded.items():
+                if key in self.scopes:
+                    continue
+                # Writes made while the query ran are newer than what it read
+                if key in self.dirty_games:
+                    scope["game_name"] = self.dirty_games[key]
+                for (g, c, user_id), character in self.dirty_characters.items():
+                    if (g, c) == key:
+                        scope["characters"][user_id] = character
+                self.scopes[key] = scope
+        return self.scopes[keys[0]], self.scopes[keys[1]]
+
+    async def set_game(self, guild_id: int, name: str, channel_id: int | None = None) -> None:
+        scope, _ = await self._scopes(guild_id, channel_id)
+        scope["game_name"] = name.strip()
+        self.dirty_games[(guild_id, _channel(channel_id))] = name.strip()
+        self._schedule_flush()
+
+    async def set_character(
         self, guild_id: int, user_id: int, character: str, channel_id: int | None = None
     ) -> None:
-        cfg = self._load(guild_id, channel_id)
-        cfg["characters"][str(user_id)] = character.strip()
-        self._save(guild_id, channel_id, cfg)
+        scope, _ = await self._scopes(guild_id, channel_id)
+        scope["characters"][user_id] = character.strip()
+        self.dirty_characters[(guild_id, _channel(channel_id), user_id)] = character.strip()
+        self._schedule_flush()
 
-    def get_game(self, guild_id: int, channel_id: int | None = None) -> str | None:
-        cfg = self._load(guild_id, channel_id)
-        return cfg["game_name"]
+    async def get_game(self, guild_id: int, channel_id: int | None = None) -> str | None:
+        scope, guild_wide = await self._scopes(guild_id, channel_id)
+        return scope["game_name"] or guild_wide["game_name"]
 
-    def get_character(
+    async def get_character(
         self, guild_id: int, user_id: int, channel_id: int | None = None
     ) -> str | None:
-        cfg = self._load(guild_id, channel_id)
-        return cfg["characters"].get(str(user_id))
+        scope, guild_wide = await self._scopes(guild_id, channel_id)
+        return scope["characters"].get(user_id) or guild_wide["characters"].get(user_id)
+
+    async def get_mapping(self, guild_id: int, channel_id: int | None = None) -> dict:
+        """Game name and characters by user id, channel settings over guild-wide ones"""
+        scope, guild_wide = await self._scopes(guild_id, channel_id)
+        return {
+            "game_name": scope["game_name"] or guild_wide["game_name"],
+            "characters": {**guild_wide["characters"], **scope["characters"]},
+        }
+
+    def _schedule_flush(self) -> None:
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
 
-    def get_mapping(self, guild_id: int, channel_id: int) -> dict:
-        cfg = self._load(guild_id, channel_id)
+    def _write(self, games: dict, characters: dict) -> None:
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO games VALUES (?, ?, ?)",
+                [(guild_id, channel, name) for (guild_id, channel), name in games.items()],
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO characters VALUES (?, ?, ?, ?)",
+                [(*key, character) for key, character in characters.items()],
+            )
 
-        game_name = cfg["game_name"]
-        characters = cfg["characters"].copy()
+    async def flush(self) -> None:
+        """Write every pending change in one transaction"""
+        games, self.dirty_games = self.dirty_games, {}
+        characters, self.dirty_characters = self.dirty_characters, {}
+        if not games and not characters:
+            return
+        try:
+            await asyncio.to_thread(self._write, games, characters)
+        except Exception as e:
+            print(f"Error saving game settings: {e}")
+            # Keep them for the next flush, unless they were overwritten since
+            self.dirty_games = {**games, **self.dirty_games}
+            self.dirty_characters = {**characters, **self.dirty_characters}
+            self._schedule_flush()
 
-        return {"game_name": game_name, "characters": characters}
+    def close(self) -> None:
+        """Write pending changes synchronously, for shutdown"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        self._write(self.dirty_games, self.dirty_characters)
+        self.dirty_games = {}
+        self.dirty_characters = {}
+        self.db.close()
@@ -0,0 +1,48 @@
+import asyncio
+import json
+import struct
+
+# Every message is a 4-byte big-endian header length, a JSON header and an
+# optional binary payload whose size is given by the header's "payload" key
+HEADER = struct.Struct(">I")
+MAX_HEADER = 16 * 1024 * 1024
+# A full batch of 30 s chunks is about 15 MB of float32 samples
+MAX_PAYLOAD = 64 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+async def read_message(
+    reader: asyncio.StreamReader, token: str | None = None
+) -> tuple[dict, bytes]:
+    """Read one message; with a ``token``, reject a sender without it before its payload"""
+    (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if length > MAX_HEADER:
+        raise ProtocolError(f"Header of {length} bytes is too large")
+    header = json.loads(await reader.readexactly(length))
+    if token and header.get("token") != token:
+        raise PermissionError("Invalid worker token")
+    size = header.get("payload", 0)
+    if not isinstance(size, int) or not 0 <= size <= MAX_PAYLOAD:
+        raise ProtocolError(f"Payload of {size} bytes is too large")
+    payload = await reader.readexactly(size)
+    return header, payload
+
+
+async def write_message(
+    writer: asyncio.StreamWriter, header: dict, payload: bytes = b""
+) -> None:
+    body = json.dumps({**header, "payload": len(payload)}).encode()
+    writer.write(HEADER.pack(len(body)) + body)
+    if payload:
+        writer.write(payload)
+    await writer.drain()
+
+
+def parse_address(address: str, default_port: int = 8765) -> tuple[str, int]:
+    host, _, port = address.strip().rpartition(":")
+    if not host:
+        return port or "127.0.0.1", default_port
+    return host, int(port)
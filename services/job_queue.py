@@ -0,0 +1,746 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from services.audio import SAMPLE_RATE, detect_speech, plan_chunks
+from services.batching import DECODING_OPTIONS
+from services.metrics import metrics
+from services.model_tiers import ModelTierPolicy
+from services.transcript_cache import TranscriptCache, cache_key
+from services.transcription import Transcriber, chunk_pieces, remap_segments
+
+BATCH_SECONDS = metrics.histogram(
+    "transcription_batch_seconds", "Wall time of each batch sent to a model, by model"
+)
+TRANSCRIBED_SECONDS = metrics.counter(
+    "transcribed_audio_seconds_total", "Seconds of speech transcribed, by model"
+)
+MODEL_SECONDS = metrics.counter(
+    "transcription_seconds_total", "Wall seconds spent in model batches, by model"
+)
+CACHE_LOOKUPS = metrics.counter(
+    "transcript_cache_lookups_total", "Chunks looked up in the transcript cache, by result"
+)
+FAILED_BATCHES = metrics.counter(
+    "transcription_failed_batches_total", "Batches that raised, by model"
+)
+
+
+def real_time_factor(model: str | None = None) -> float | None:
+    """Model wall seconds per second of speech, for one model or all of them"""
+    labels = {"model": model} if model else {}
+    audio = TRANSCRIBED_SECONDS.value(**labels)
+    return MODEL_SECONDS.value(**labels) / audio if audio else None
+
+
+metrics.gauge(
+    "transcription_real_time_factor",
+    "Model wall seconds per second of speech, by model",
+    lambda: [
+        (labels, real_time_factor(labels["model"]))
+        for labels in TRANSCRIBED_SECONDS.label_sets()
+    ],
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    name TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    guild_id INTEGER,
+    text_channel_id INTEGER,
+    voice_channel_id INTEGER,
+    model TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'recording',
+    start_offsets TEXT NOT NULL DEFAULT '{}',
+    created_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL REFERENCES sessions (name) ON DELETE CASCADE,
+    guild_id INTEGER,
+    user_id INTEGER NOT NULL,
+    window_index INTEGER NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    speech_path TEXT NOT NULL,
+    ranges TEXT NOT NULL,
+    duration REAL NOT NULL,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    pinned INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_by_session ON jobs (session, user_id);
+"""
+
+# Columns added since the first release; CREATE TABLE IF NOT EXISTS skips them
+MIGRATIONS = [
+    ("jobs", "pinned", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+class JobQueue:
+    """Durable SQLite record of recording sessions and their transcription jobs
+
+    Every chunk of speech becomes a job as soon as it is cut, so a restart
+    only loses work that was in flight, and that is simply run again.
+    """
+
+    def __init__(self, db_path: str):
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA foreign_keys=ON")
+            self.db.executescript(SCHEMA)
+            for table, column, definition in MIGRATIONS:
+                columns = [row[1] for row in self.db.execute(f"PRAGMA table_info({table})")]
+                if column not in columns:
+                    self.db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def add_session(
+        self,
+        name: str,
+        folder: str,
+        guild_id: int | None,
+        text_channel_id: int | None,
+        voice_channel_id: int | None,
+        model: str,
+    ) -> None:
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT INTO sessions (name, folder, guild_id, text_channel_id,"
+                " voice_channel_id, model, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    name,
+                    folder,
+                    guild_id,
+                    text_channel_id,
+                    voice_channel_id,
+                    model,
+                    time.time(),
+                ),
+            )
+
+    def set_session_state(
+        self, name: str, state: str, start_offsets: dict | None = None
+    ) -> None:
+        with self.lock, self.db:
+            if start_offsets is None:
+                self.db.execute(
+                    "UPDATE sessions SET state = ? WHERE name = ?", (state, name)
+                )
+            else:
+                self.db.execute(
+                    "UPDATE sessions SET state = ?, start_offsets = ? WHERE name = ?",
+                    (state, json.dumps(start_offsets), name),
+                )
+
+    def set_start_offset(self, name: str, user_id: int, offset: float) -> None:
+        """Record when a user started speaking, as soon as they do"""
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE sessions SET start_offsets = json_set(start_offsets, ?, ?)"
+                " WHERE name = ?",
+                (f'$."{user_id}"', offset, name),
+            )
+
+    def queued_until(self, name: str) -> dict[int, tuple[int, int]]:
+        """Per user, the last window queued and the sample its last chunk ends at"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT user_id, window_index, ranges FROM jobs WHERE session = ?"
+                " ORDER BY user_id, window_index, chunk_index",
+                (name,),
+            ).fetchall()
+        return {
+            row["user_id"]: (row["window_index"], json.loads(row["ranges"])[-1][1])
+            for row in rows
+        }
+
+    def get_session(self, name: str) -> sqlite3.Row | None:
+        with self.lock:
+            return self.db.execute(
+                "SELECT * FROM sessions WHERE name = ?", (name,)
+            ).fetchone()
+
+    def session_names(self) -> set[str]:
+        with self.lock:
+            return {row[0] for row in self.db.execute("SELECT name FROM sessions")}
+
+    def unfinished_sessions(self) -> list[sqlite3.Row]:
+        with self.lock:
+            return self.db.execute(
+                "SELECT * FROM sessions WHERE state != 'finished' ORDER BY created_at"
+            ).fetchall()
+
+    def add_jobs(self, jobs: list[dict]) -> list[dict]:
+        """Insert jobs and return them with their ids and enqueue time"""
+        now = time.time()
+        with self.lock, self.db:
+            for job in jobs:
+                job["enqueued_at"] = now
+                job["id"] = self.db.execute(
+                    "INSERT INTO jobs (session, guild_id, user_id, window_index,"
+                    " chunk_index, speech_path, ranges, duration, model, pinned,"
+                    " enqueued_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        job["session"],
+                        job["guild_id"],
+                        job["user_id"],
+                        job["window_index"],
+                        job["chunk_index"],
+                        job["speech_path"],
+                        json.dumps(job["ranges"]),
+                        job["duration"],
+                        job["model"],
+                        job.get("pinned", False),
+                        now,
+                    ),
+                ).lastrowid
+        return jobs
+
+    def requeue_session(
+        self, name: str, model: str, pinned: bool = False
+    ) -> list[dict]:
+        """Queue fresh jobs for ``model`` over a session's chunks, keeping its chunking
+
+        Identical chunks mean identical cache keys, so only what the new
+        model has not seen is transcribed again. Earlier results stay until
+        the new job for the same chunk succeeds, so a failed run loses
+        nothing. ``pinned`` jobs keep ``model`` under a tier policy, across
+        restarts too. Returns the new jobs.
+        """
+        now = time.time()
+        with self.lock, self.db:
+            rows = self.db.execute(
+                "SELECT session, guild_id, user_id, window_index, chunk_index,"
+                " speech_path, ranges, duration FROM jobs WHERE session = ?"
+                " GROUP BY user_id, window_index, chunk_index"
+                " ORDER BY user_id, window_index, chunk_index",
+                (name,),
+            ).fetchall()
+            # Only finished results are worth keeping
+            self.db.execute(
+                "DELETE FROM jobs WHERE session = ? AND status != 'done'", (name,)
+            )
+            self.db.execute(
+                "UPDATE sessions SET state = 'transcribing', model = ? WHERE name = ?",
+                (model, name),
+            )
+            jobs = []
+            for row in rows:
+                job = {
+                    **dict(row),
+                    "model": model,
+                    "pinned": pinned,
+                    "enqueued_at": now,
+                }
+                job["id"] = self.db.execute(
+                    "INSERT INTO jobs (session, guild_id, user_id, window_index,"
+                    " chunk_index, speech_path, ranges, duration, model, pinned,"
+                    " enqueued_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        job["session"],
+                        job["guild_id"],
+                        job["user_id"],
+                        job["window_index"],
+                        job["chunk_index"],
+                        job["speech_path"],
+                        job["ranges"],
+                        job["duration"],
+                        model,
+                        pinned,
+                        now,
+                    ),
+                ).lastrowid
+                job["ranges"] = json.loads(job["ranges"])
+                jobs.append(job)
+        return jobs
+
+    def unfinished_jobs(self) -> list[dict]:
+        """Jobs to pick back up on startup; 'running' ones died with the process"""
+        with self.lock, self.db:
+            self.db.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+            rows = self.db.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' ORDER BY id"
+            ).fetchall()
+        return [
+            {
+                **dict(row),
+                "ranges": json.loads(row["ranges"]),
+                "pinned": bool(row["pinned"]),
+            }
+            for row in rows
+        ]
+
+    def mark_running(self, job_id: int, model: str) -> None:
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE jobs SET status = 'running', model = ?, attempts = attempts + 1"
+                " WHERE id = ?",
+                (model, job_id),
+            )
+
+    def mark_pending(self, job_id: int, error: str) -> None:
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE jobs SET status = 'pending', error = ? WHERE id = ?",
+                (error, job_id),
+            )
+
+    def mark_finished(
+        self, job_id: int, result: dict | None = None, error: str | None = None
+    ) -> None:
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?"
+                " WHERE id = ?",
+                (
+                    "done" if error is None else "failed",
+                    json.dumps(result) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def mark_finished_many(self, results: list[tuple[int, dict]]) -> None:
+        now = time.time()
+        with self.lock, self.db:
+            self.db.executemany(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL,"
+                " finished_at = ? WHERE id = ?",
+                [(json.dumps(result), now, job_id) for job_id, result in results],
+            )
+            # Drop the results these replace from an earlier transcription
+            self.db.executemany(
+                "DELETE FROM jobs WHERE id < ? AND (session, user_id, window_index,"
+                " chunk_index) = (SELECT session, user_id, window_index, chunk_index"
+                " FROM jobs WHERE id = ?)",
+                [(job_id, job_id) for job_id, _ in results],
+            )
+
+    def sessions_below(self, model: str) -> list[sqlite3.Row]:
+        """Finished sessions with chunks transcribed by any other model, with counts"""
+        with self.lock:
+            return self.db.execute(
+                "SELECT s.name, s.guild_id, COUNT(*) AS chunks FROM sessions s"
+                " JOIN jobs j ON j.session = s.name"
+                " WHERE s.state = 'finished' AND j.status = 'done' AND j.model != ?"
+                " GROUP BY s.name ORDER BY s.name",
+                (model,),
+            ).fetchall()
+
+    def session_results(self, name: str) -> dict[int, dict]:
+        """Stitch finished jobs into one Whisper-style result per user, in track order
+
+        Where a chunk was transcribed again and the new job failed, the
+        earlier result is used.
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT user_id, window_index, chunk_index, duration, model, status,"
+                " result, error FROM jobs WHERE session = ?"
+                " ORDER BY user_id, window_index, chunk_index, status = 'done', id",
+                (name,),
+            ).fetchall()
+
+        # The last row of each chunk is its newest result, or newest error
+        latest = {
+            (row["user_id"], row["window_index"], row["chunk_index"]): row
+            for row in rows
+        }
+        results = {}
+        for row in latest.values():
+            user = results.setdefault(
+                row["user_id"],
+                {
+                    "text": "",
+                    "segments": [],
+                    "speech_seconds": 0.0,
+                    "errors": [],
+                    "models": {},
+                },
+            )
+            user["speech_seconds"] += row["duration"]
+            if row["status"] == "done":
+                result = json.loads(row["result"])
+                if result["text"]:
+                    user["text"] = f"{user['text']} {result['text']}".strip()
+                # Tag every segment with the tier that produced it
+                for segment in result["segments"]:
+                    segment["model"] = row["model"]
+                user["segments"].extend(result["segments"])
+                user["models"][row["model"]] = user["models"].get(row["model"], 0) + 1
+            elif row["error"]:
+                user["errors"].append(row["error"])
+        return results
+
+
+def load_ranges(speech_path: str, ranges: list) -> np.ndarray:
+    """Read sample ranges back from a 16 kHz float32 stream on disk"""
+    audio = np.memmap(speech_path, dtype=np.float32, mode="r")
+    return np.concatenate([np.array(audio[start:end]) for start, end in ranges])
+
+
+class TranscriptionScheduler:
+    """Works through queued jobs in batches with bounded concurrency
+
+    The next job comes from the guild with the fewest jobs running (fair
+    share), then the shortest job first, with waiting time slowly raising
+    priority so long jobs are never starved. Other waiting jobs for the same
+    model ride along in its batch, from any user or session, so the model
+    runs one wide pass instead of many narrow ones. A batch that is not full
+    waits up to ``max_wait`` seconds for more chunks before it goes anyway.
+    Chunks already in the ``cache`` never reach the model at all. With a
+    tier ``policy`` each batch runs on the model the policy picks from the
+    backlog and latency target, whatever model its jobs were queued with,
+    unless they are ``pinned`` to the model they asked for. A failed batch's
+    jobs are retried after ``retry_delay`` seconds, doubling each time.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        pool: Transcriber,
+        concurrency: int,
+        aging: float = 0.1,
+        max_attempts: int = 3,
+        retry_delay: float = 5.0,
+        batch_size: int = 8,
+        max_wait: float = 2.0,
+        cache: TranscriptCache | None = None,
+        policy: ModelTierPolicy | None = None,
+    ):
+        self.queue = queue
+        self.pool = pool
+        self.concurrency = concurrency
+        self.aging = aging
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.cache = cache
+        self.policy = policy
+        self.options = dict(DECODING_OPTIONS)
+        self.pending: dict[int, dict] = {}
+        self.audio: dict[int, np.ndarray] = {}
+        self.running: dict[int, dict] = {}
+        self.running_by_guild: dict[int | None, int] = {}
+        self.batches = 0
+        self.outstanding: dict[str, int] = {}
+        self.session_guilds: dict[str, int | None] = {}
+        self.session_events: dict[str, asyncio.Event] = {}
+        self.batch_seconds = 10.0  # running average of wall time per batch
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self.task is not None:
+            return
+        for job in await asyncio.to_thread(self.queue.unfinished_jobs):
+            self.register(job)
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+
+    def register(self, job: dict, audio: np.ndarray | None = None) -> None:
+        """Queue a job that is already stored; must be called on the event loop"""
+        self.pending[job["id"]] = job
+        if audio is not None:
+            # Live jobs keep their samples in memory; resumed ones read the file
+            self.audio[job["id"]] = audio
+        self.outstanding[job["session"]] = self.outstanding.get(job["session"], 0) + 1
+        self.session_guilds[job["session"]] = job["guild_id"]
+        self.wakeup.set()
+
+    def _key(self, job: dict, now: float) -> tuple:
+        waited = now - job["enqueued_at"]
+        return (
+            self.running_by_guild.get(job["guild_id"], 0),
+            job["duration"] - waited * self.aging,
+            job["id"],
+        )
+
+    def _next_batch(self, now: float) -> list[dict]:
+        order = sorted(
+            (job for job in self.pending.values() if job.get("not_before", 0) <= now),
+            key=lambda job: self._key(job, now),
+        )
+        if not order:
+            return []
+        if self.policy is not None and not order[0].get("pinned"):
+            # The tier is picked per batch, so any waiting jobs can share one
+            return [job for job in order if not job.get("pinned")][: self.batch_size]
+        model = order[0]["model"]
+        return [
+            job
+            for job in order
+            if job["model"] == model and job.get("pinned") == order[0].get("pinned")
+        ][: self.batch_size]
+
+    def _assign_tier(self, batch: list[dict], now: float) -> None:
+        tier = self.policy.choose(  # type: ignore
+            sum(job["duration"] for job in self.pending.values()),
+            now - min(job["enqueued_at"] for job in self.pending.values()),
+            self.policy.backlog(self.running.values()),  # type: ignore
+            self.concurrency,
+        )
+        for job in batch:
+            job["model"] = tier
+
+    async def _run(self) -> None:
+        while True:
+            timeout = None
+            while self.pending and self.batches < self.concurrency:
+                now = time.time()
+                batch = self._next_batch(now)
+                if not batch:
+                    # Everything waiting is backing off after a failure
+                    timeout = (
+                        min(job["not_before"] for job in self.pending.values()) - now
+                    )
+                    break
+                deadline = min(job["enqueued_at"] for job in batch) + self.max_wait
+                if len(batch) < self.batch_size and deadline > now:
+                    # Give other users' chunks a moment to fill the batch
+                    timeout = deadline - now
+                    break
+                if self.policy is not None and not batch[0].get("pinned"):
+                    self._assign_tier(batch, now)
+                for job in batch:
+                    del self.pending[job["id"]]
+                    self.running[job["id"]] = job
+                    guild_id = job["guild_id"]
+                    self.running_by_guild[guild_id] = (
+                        self.running_by_guild.get(guild_id, 0) + 1
+                    )
+                self.batches += 1
+                asyncio.create_task(self._execute(batch))
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+    def _load_batch(self, batch: list[dict]) -> tuple[list, list, list]:
+        audio = []
+        keys = []
+        results = []
+        # Read per batch, since remote workers only report their backend once they answer
+        options = {"backend": self.pool.backend, **self.options}
+        for job in batch:
+            self.queue.mark_running(job["id"], job["model"])
+            samples = self.audio.pop(job["id"], None)
+            if samples is None:
+                samples = load_ranges(job["speech_path"], job["ranges"])
+            audio.append(samples)
+            if self.cache is not None:
+                key = cache_key(samples, job["model"], options)
+                keys.append(key)
+                results.append(self.cache.get(key))
+            else:
+                keys.append(None)
+                results.append(None)
+        return audio, keys, results
+
+    def _store_batch(self, batch: list[dict], results: list[dict], fresh: dict) -> None:
+        if self.cache is not None:
+            for key, result in fresh.items():
+                self.cache.put(key, result)
+        self.queue.mark_finished_many(
+            [
+                (
+                    job["id"],
+                    {
+                        "text": result["text"].strip(),
+                        "segments": remap_segments(result, chunk_pieces(job["ranges"])),
+                    },
+                )
+                for job, result in zip(batch, results)
+            ]
+        )
+
+    async def _execute(self, batch: list[dict]) -> None:
+        started = time.perf_counter()
+        retry = []
+        try:
+            audio, keys, results = await asyncio.to_thread(self._load_batch, batch)
+            misses = [i for i, result in enumerate(results) if result is None]
+            fresh = {}
+            if misses:
+                computed = await self.pool.transcribe_batch(
+                    [audio[i] for i in misses], batch[0]["model"]
+                )
+                for i, result in zip(misses, computed):
+                    # Keep only what the transcript needs, so cache entries stay small
+                    results[i] = {
+                        "text": result["text"],
+                        "segments": [
+                            {"start": s["start"], "end": s["end"], "text": s["text"]}
+                            for s in result["segments"]
+                        ],
+                    }
+                    if keys[i] is not None:
+                        fresh[keys[i]] = results[i]
+            await asyncio.to_thread(self._store_batch, batch, results, fresh)
+            CACHE_LOOKUPS.inc(len(batch) - len(misses), result="hit")
+            CACHE_LOOKUPS.inc(len(misses), result="miss")
+            if misses:
+                elapsed = time.perf_counter() - started
+                model = batch[0]["model"]
+                speech = sum(batch[i]["duration"] for i in misses)
+                BATCH_SECONDS.observe(elapsed, model=model)
+                MODEL_SECONDS.inc(elapsed, model=model)
+                TRANSCRIBED_SECONDS.inc(speech, model=model)
+                self.batch_seconds = 0.8 * self.batch_seconds + 0.2 * elapsed
+                if self.policy is not None:
+                    self.policy.observe(model, speech, elapsed)
+        except Exception as e:
+            print(f"Error transcribing a batch of {len(batch)} jobs: {e}")
+            FAILED_BATCHES.inc(model=batch[0]["model"])
+            for job in batch:
+                # Counted here rather than from the stored attempts, which also
+                # include runs cut short by a restart
+                job["retries"] = job.get("retries", 0) + 1
+                if job["retries"] < self.max_attempts:
+                    job["not_before"] = time.time() + self.retry_delay * 2 ** (
+                        job["retries"] - 1
+                    )
+                    retry.append(job)
+                    await asyncio.to_thread(self.queue.mark_pending, job["id"], str(e))
+                else:
+                    await asyncio.to_thread(
+                        self.queue.mark_finished, job["id"], error=str(e)
+                    )
+        finally:
+            self.batches -= 1
+            for job in batch:
+                del self.running[job["id"]]
+                self.running_by_guild[job["guild_id"]] -= 1
+                if job in retry:
+                    self.pending[job["id"]] = job
+                else:
+                    self._finish(job["session"])
+            self.wakeup.set()
+
+    def _finish(self, session: str) -> None:
+        self.outstanding[session] -= 1
+        if not self.outstanding[session]:
+            del self.outstanding[session]
+            self.session_guilds.pop(session, None)
+            event = self.session_events.pop(session, None)
+            if event is not None:
+                event.set()
+
+    async def wait_session(self, session: str) -> None:
+        """Wait until every job registered for a session has finished"""
+        if not self.outstanding.get(session):
+            return
+        event = self.session_events.setdefault(session, asyncio.Event())
+        await event.wait()
+
+    def depth(self) -> int:
+        return len(self.pending) + len(self.running)
+
+    def guild_sessions(self, guild_id: int | None) -> list[str]:
+        """Sessions of a guild that still have jobs queued or running"""
+        return sorted(
+            session
+            for session, session_guild in self.session_guilds.items()
+            if session_guild == guild_id
+        )
+
+    def estimate(self, session: str) -> tuple[int, int, float] | None:
+        """Position of the session's first waiting job, jobs left, and ETA in seconds"""
+        remaining = self.outstanding.get(session, 0)
+        if not remaining:
+            return None
+        now = time.time()
+        order = sorted(self.pending.values(), key=lambda job: self._key(job, now))
+        ranks = [rank for rank, job in enumerate(order) if job["session"] == session]
+        if not ranks:
+            # Everything left is already running
+            return 0, remaining, self.batch_seconds
+        rounds = ranks[-1] // (self.concurrency * self.batch_size) + 1
+        return ranks[0] + 1, remaining, rounds * self.batch_seconds
+
+
+class LiveTranscription:
+    """Turns a recording's windows into queued transcription jobs as they arrive
+
+    Each window first goes through voice-activity detection. Its speech
+    regions are packed into chunks of at most ``chunk_seconds`` (split at
+    pauses when needed), and every chunk becomes a durable job that the
+    scheduler can run in parallel with the rest.
+    """
+
+    def __init__(
+        self,
+        scheduler: TranscriptionScheduler,
+        session: str,
+        folder: str,
+        guild_id: int | None,
+        model_name: str,
+        loop: asyncio.AbstractEventLoop,
+        chunk_seconds: float = 30,
+        pinned: bool = False,
+    ):
+        self.scheduler = scheduler
+        self.session = session
+        self.folder = folder
+        self.guild_id = guild_id
+        self.model_name = model_name
+        self.loop = loop
+        self.chunk_samples = int(chunk_seconds * SAMPLE_RATE)
+        self.pinned = pinned
+
+    def start(self, user_id: int, offset: float) -> None:
+        """Called from the voice receive thread when a user's first audio arrives"""
+        # Stored right away, so a session resumed after a crash keeps its timing
+        self.scheduler.queue.set_start_offset(self.session, user_id, offset)
+
+    def feed(self, user_id: int, index: int, offset: float, samples) -> None:
+        """Called from the voice receive thread for every finished window"""
+        # VAD, packing and the job insert all run here, off the event loop
+        window_start = round(offset * SAMPLE_RATE)
+        jobs = []
+        audio = []
+        chunks = plan_chunks(samples, detect_speech(samples), self.chunk_samples)
+        for chunk_index, ranges in enumerate(chunks):
+            jobs.append(
+                {
+                    "session": self.session,
+                    "guild_id": self.guild_id,
+                    "user_id": user_id,
+                    "window_index": index,
+                    "chunk_index": chunk_index,
+                    "speech_path": os.path.join(self.folder, f"{user_id}_16k.f32"),
+                    "ranges": [
+                        [window_start + start, window_start + end]
+                        for start, end in ranges
+                    ],
+                    "duration": sum(end - start for start, end in ranges) / SAMPLE_RATE,
+                    "model": self.model_name,
+                    "pinned": self.pinned,
+                }
+            )
+            audio.append(np.concatenate([samples[start:end] for start, end in ranges]))
+        if not jobs:
+            return
+
+        self.scheduler.queue.add_jobs(jobs)
+        # Registering through the loop keeps these ahead of once_done
+        for job, chunk in zip(jobs, audio):
+            self.loop.call_soon_threadsafe(self.scheduler.register, job, chunk)
@@ -0,0 +1,355 @@
+import asyncio
+import os
+import resource
+import threading
+import time
+from aiohttp import web
+
+# Seconds; wide enough for a 5 ms cache hit and a 10 minute session drain
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600
+)
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class Counter:
+    """A monotonically increasing total, per label set"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, lock: threading.Lock):
+        self.name = name
+        self.help = help
+        self.lock = lock
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _labels(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """The total for one label set, or across all of them if none are given"""
+        if labels:
+            return self.values.get(_labels(labels), 0)
+        return sum(self.values.values())
+
+    def label_sets(self) -> list[dict]:
+        return [dict(labels) for labels in self.values]
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, labels, value
+
+
+class Gauge:
+    """A value that goes up and down, set directly or read from ``func`` on export
+
+    ``func`` returns a number, or a list of (labels dict, number) pairs.
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, lock: threading.Lock, func=None):
+        self.name = name
+        self.help = help
+        self.lock = lock
+        self.func = func
+        self.values: dict[tuple, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self.lock:
+            self.values[_labels(labels)] = value
+
+    def samples(self):
+        if self.func is None:
+            for labels, value in self.values.items():
+                yield self.name, labels, value
+            return
+        try:
+            value = self.func()
+        except Exception as e:
+            print(f"Error reading metric {self.name}: {e}")
+            return
+        if isinstance(value, (int, float)):
+            yield self.name, (), value
+        else:
+            for labels, v in value:
+                yield self.name, _labels(labels), v
+
+
+class Histogram:
+    """Observations counted into cumulative buckets, per label set"""
+
+    type = "histogram"
+
+    def __init__(
+        self, name: str, help: str, lock: threading.Lock, buckets=DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.lock = lock
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., +Inf count, sum, max]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels(labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = [0] * (len(self.buckets) + 1) + [0.0, 0.0]
+                self.series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-2] += value
+            series[-1] = max(series[-1], value)
+
+    def time(self, **labels) -> "Span":
+        return Span(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self.series.get(_labels(labels))
+        return series[len(self.buckets)] if series else 0
+
+    def quantile(self, q: float, **labels) -> float | None:
+        """Upper bound of the bucket holding the q-th observation, capped at the max seen"""
+        series = self.series.get(_labels(labels))
+        if not series:
+            return None
+        total = series[len(self.buckets)]
+        for i, bound in enumerate(self.buckets):
+            if series[i] >= q * total:
+                return min(bound, series[-1])
+        return series[-1]
+
+    def label_sets(self) -> list[dict]:
+        return [dict(labels) for labels in self.series]
+
+    def samples(self):
+        for labels, series in self.series.items():
+            total = series[len(self.buckets)]
+            for bound, count in zip(self.buckets, series):
+                yield f"{self.name}_bucket", labels + (("le", f"{bound:g}"),), count
+            yield f"{self.name}_bucket", labels + (("le", "+Inf"),), total
+            yield f"{self.name}_sum", labels, series[-2]
+            yield f"{self.name}_count", labels, total
+
+
+class Span:
+    """Times a ``with`` block into a histogram, whether or not it raises"""
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self) -> "Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class StageTimer:
+    """Times consecutive stages of one run: each ``lap`` closes the stage just finished"""
+
+    def __init__(self, histogram: Histogram, **labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = self.last = time.perf_counter()
+
+    def lap(self, stage: str) -> float:
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.last = now
+        self.histogram.observe(elapsed, stage=stage, **self.labels)
+        return elapsed
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+class Metrics:
+    """Registry of the process's metrics, rendered in the Prometheus text format
+
+    Asking for a metric that already exists returns it, so modules can
+    declare what they record at import time and cogs can be reloaded. A
+    name already registered as another kind of metric is an error.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics: dict[str, Counter | Gauge | Histogram] = {}
+        self.started = time.time()
+
+    def _kind_error(self, metric: Counter | Gauge | Histogram, kind: str) -> ValueError:
+        return ValueError(
+            f"Metric {metric.name!r} is a {metric.type}, it cannot be used as a {kind}"
+        )
+
+    def counter(self, name: str, help: str) -> Counter:
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = Counter(name, help, self.lock)
+        elif not isinstance(metric, Counter):
+            raise self._kind_error(metric, Counter.type)
+        return metric
+
+    def histogram(self, name: str, help: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = Histogram(name, help, self.lock, buckets)
+        elif not isinstance(metric, Histogram):
+            raise self._kind_error(metric, Histogram.type)
+        return metric
+
+    def gauge(self, name: str, help: str, func=None) -> Gauge:
+        gauge = self.metrics.get(name)
+        if gauge is None:
+            gauge = self.metrics[name] = Gauge(name, help, self.lock)
+        elif not isinstance(gauge, Gauge):
+            raise self._kind_error(gauge, Gauge.type)
+        if func is not None:
+            # A reloaded cog replaces the callback that read its predecessor
+            gauge.func = func
+        return gauge
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            with self.lock:
+                samples = list(metric.samples())
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in samples:
+                # repr keeps full precision for timestamps and byte counts
+                value = value if isinstance(value, int) else repr(float(value))
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def rss_bytes() -> int:
+    """Resident memory of this process now, or its peak where /proc is missing"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+metrics = Metrics()
+metrics.gauge(
+    "process_resident_memory_bytes", "Resident memory of the bot process", rss_bytes
+)
+metrics.gauge(
+    "process_start_time_seconds", "Unix time the bot started", lambda: metrics.started
+)
+COMMAND_SECONDS = metrics.histogram(
+    "discord_command_seconds", "Wall time of slash commands, by command and outcome"
+)
+PIPELINE_SECONDS = metrics.histogram(
+    "pipeline_stage_seconds", "Wall time of each stage of finishing a recorded session"
+)
+
+
+def describe_histogram(histogram: Histogram, **labels) -> str:
+    """"12× p50 0.4s p95 2.5s" for one series of a histogram"""
+    count = histogram.count(**labels)
+    if not count:
+        return "no data"
+    return (
+        f"{count}× p50 {histogram.quantile(0.5, **labels):.2f}s "
+        f"p95 {histogram.quantile(0.95, **labels):.2f}s"
+    )
+
+
+class MetricsExporter:
+    """Serves the registry at ``/metrics`` over HTTP and/or rewrites a file periodically"""
+
+    def __init__(
+        self,
+        registry: Metrics,
+        port: int | None = None,
+        host: str = "127.0.0.1",
+        path: str | None = None,
+        interval: float = 15,
+    ):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.path = path
+        self.interval = interval
+        self.runner: web.AppRunner | None = None
+        self.task: asyncio.Task | None = None
+
+    @classmethod
+    def from_env(cls, registry: Metrics) -> "MetricsExporter":
+        port = os.getenv("METRICS_PORT", "")
+        return cls(
+            registry,
+            int(port) if port.strip() else None,
+            os.getenv("METRICS_HOST", "127.0.0.1"),
+            os.getenv("METRICS_FILE", "") or None,
+            float(os.getenv("METRICS_FILE_INTERVAL_SECONDS", "15")),
+        )
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.registry.render(),
+            content_type="text/plain",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    def _write(self, text: str) -> None:
+        partial_path = self.path + ".part"  # type: ignore
+        with open(partial_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        # Scrapers never see a half-written file
+        os.replace(partial_path, self.path)  # type: ignore
+
+    async def _write_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self._write, self.registry.render())
+            except Exception as e:
+                print(f"Error writing metrics to {self.path}: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        if self.port is not None and self.runner is None:
+            app = web.Application()
+            app.router.add_get("/metrics", self._handle)
+            self.runner = web.AppRunner(app, access_log=None)
+            await self.runner.setup()
+            await web.TCPSite(self.runner, self.host, self.port).start()
+            print(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        if self.path is not None and self.task is None:
+            self.task = asyncio.create_task(self._write_loop())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
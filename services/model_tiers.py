@@ -0,0 +1,56 @@
+# Rough CPU seconds per second of speech for one worker, refined as batches finish
+DEFAULT_COST = {
+    "tiny": 0.05,
+    "base": 0.1,
+    "small": 0.3,
+    "medium": 0.9,
+    "turbo": 0.8,
+    "large": 1.8,
+}
+
+
+class ModelTierPolicy:
+    """Picks the most accurate model that still meets a latency target
+
+    ``tiers`` run from fastest to most accurate. Before each batch the
+    policy asks, for every tier: if all the speech waiting in the queue ran
+    at this tier, on top of the work already running and spread over the
+    workers, would the oldest waiting chunk still finish within
+    ``target_latency``? The biggest tier that would wins; when none would,
+    the fastest one is used. Costs start from rough CPU figures and follow
+    measured batch times.
+    """
+
+    def __init__(self, tiers: list[str], target_latency: float):
+        self.tiers = tiers
+        self.target_latency = target_latency
+        # "base.en" and "large-v3" cost about what their family does
+        self.cost = {
+            tier: DEFAULT_COST.get(tier.replace(".", "-").split("-")[0], 0.5)
+            for tier in tiers
+        }
+
+    @classmethod
+    def parse(cls, tiers: str, target_latency: float) -> "ModelTierPolicy | None":
+        names = [name.strip() for name in tiers.split(",") if name.strip()]
+        return cls(names, target_latency) if names else None
+
+    def observe(self, model_name: str, audio_seconds: float, elapsed: float) -> None:
+        if audio_seconds <= 0:
+            return
+        cost = elapsed / audio_seconds
+        previous = self.cost.get(model_name)
+        self.cost[model_name] = cost if previous is None else 0.8 * previous + 0.2 * cost
+
+    def backlog(self, jobs) -> float:
+        """Seconds of worker time the given jobs need at their assigned models"""
+        return sum(job["duration"] * self.cost.get(job["model"], 0.5) for job in jobs)
+
+    def choose(
+        self, pending_audio: float, waited: float, running: float, workers: int
+    ) -> str:
+        budget = self.target_latency - waited
+        for tier in reversed(self.tiers):
+            if (running + pending_audio * self.cost[tier]) / max(workers, 1) <= budget:
+                return tier
+        return self.tiers[0]
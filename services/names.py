@@ -0,0 +1,85 @@
+import asyncio
+import time
+from collections import OrderedDict
+from services.metrics import metrics
+
+FETCH_SECONDS = metrics.histogram(
+    "discord_fetch_user_seconds", "Wall time of each fetch_user REST call"
+)
+NAME_LOOKUPS = metrics.counter(
+    "name_lookups_total", "User names resolved, by where they were found"
+)
+
+
+def speaker_label(username: str, character: str | None) -> str:
+    """ "Thorin (alice)" when the player has a character, else just "alice" """
+    return f"{character} ({username})" if character else username
+
+
+class NameResolver:
+    """Resolves user ids to names with as few REST calls as possible
+
+    Lookups go to the guild's member cache, then the client's user cache,
+    then a TTL'd LRU of earlier fetches; only what is still unknown is
+    fetched, all concurrently.
+    """
+
+    def __init__(self, bot, ttl: float = 3600, max_size: int = 1024):
+        self.bot = bot
+        self.ttl = ttl
+        self.max_size = max_size
+        self.cache: OrderedDict[int, tuple[str, float]] = OrderedDict()
+        self.fetches = 0
+
+    def _cached(self, user_id: int) -> str | None:
+        entry = self.cache.get(user_id)
+        if entry is None:
+            return None
+        name, expires = entry
+        if expires < time.monotonic():
+            del self.cache[user_id]
+            return None
+        self.cache.move_to_end(user_id)
+        return name
+
+    def _remember(self, user_id: int, name: str) -> None:
+        self.cache[user_id] = (name, time.monotonic() + self.ttl)
+        self.cache.move_to_end(user_id)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+
+    async def _fetch(self, user_id: int) -> str | None:
+        self.fetches += 1
+        try:
+            with FETCH_SECONDS.time():
+                user = await self.bot.fetch_user(user_id)
+        except Exception as e:
+            print(f"Cannot resolve user {user_id}: {e}")
+            return None
+        self._remember(user_id, user.name)
+        return user.name
+
+    async def resolve(self, user_ids, guild=None) -> dict[int, str | None]:
+        """Usernames by id; ``None`` for users that could not be found"""
+        names = {}
+        missing = []
+        for user_id in user_ids:
+            member = guild.get_member(user_id) if guild is not None else None
+            user = member or self.bot.get_user(user_id)
+            if user is not None:
+                names[user_id] = user.name
+                self._remember(user_id, user.name)
+                NAME_LOOKUPS.inc(source="client")
+                continue
+            name = self._cached(user_id)
+            if name is None:
+                missing.append(user_id)
+            else:
+                names[user_id] = name
+                NAME_LOOKUPS.inc(source="cache")
+
+        if missing:
+            NAME_LOOKUPS.inc(len(missing), source="fetch")
+            fetched = await asyncio.gather(*(self._fetch(user_id) for user_id in missing))
+            names.update(zip(missing, fetched))
+        return names
@@ -0,0 +1,203 @@
+import asyncio
+import os
+import random
+import time
+import aiohttp
+import discord
+from services.metrics import metrics
+
+# Discord's upload cap for unboosted guilds and DMs
+DEFAULT_UPLOAD_LIMIT = 10 * 1024 * 1024
+MAX_FILES_PER_MESSAGE = 10
+
+UPLOADED_BYTES = metrics.counter(
+    "discord_upload_bytes_total", "Bytes of attachments posted to Discord"
+)
+SEND_RETRIES = metrics.counter(
+    "discord_send_retries_total", "Discord requests retried after a transient failure"
+)
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, discord.HTTPException):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, OSError))
+
+
+def pack_files(
+    paths: list[str], limit_bytes: int, max_files: int = MAX_FILES_PER_MESSAGE
+) -> tuple[list[list[str]], list[str]]:
+    """Group files into messages under the size and count limits
+
+    First-fit decreasing, so few messages are needed; the result keeps the
+    files' original order within each message. Files too large to upload
+    at all are returned separately.
+    """
+    order = {path: i for i, path in enumerate(paths)}
+    sizes = {path: os.path.getsize(path) for path in paths}
+    too_large = [path for path in paths if sizes[path] > limit_bytes]
+    packs: list[list[str]] = []
+    totals: list[int] = []
+    for path in sorted(paths, key=lambda p: -sizes[p]):
+        if sizes[path] > limit_bytes:
+            continue
+        for i, pack in enumerate(packs):
+            if len(pack) < max_files and totals[i] + sizes[path] <= limit_bytes:
+                pack.append(path)
+                totals[i] += sizes[path]
+                break
+        else:
+            packs.append([path])
+            totals.append(sizes[path])
+    packs = [sorted(pack, key=order.__getitem__) for pack in packs]
+    packs.sort(key=lambda pack: order[pack[0]])
+    return packs, too_large
+
+
+class SessionPublisher:
+    """Posts a session's progress and results to a channel without tripping rate limits
+
+    Progress goes into one message that is edited in place; updates that
+    arrive faster than ``edit_interval`` are coalesced so only the latest
+    text is sent. Attachments are packed into as few messages as the
+    upload limit allows and sent ``concurrency`` at a time. Every request
+    is retried with exponential backoff on 429s, 5xx and network errors;
+    py-cord's own retries come first, so these cover longer outages.
+    """
+
+    def __init__(
+        self,
+        channel: discord.abc.Messageable,
+        edit_interval: float = 2.0,
+        concurrency: int = 2,
+        attempts: int = 4,
+        backoff: float = 1.0,
+        upload_limit: int | None = None,
+    ):
+        self.channel = channel
+        self.edit_interval = edit_interval
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.attempts = attempts
+        self.backoff = backoff
+        guild = getattr(channel, "guild", None)
+        self.upload_limit = upload_limit or getattr(
+            guild, "filesize_limit", DEFAULT_UPLOAD_LIMIT
+        )
+        self.message: discord.Message | None = None
+        self.shown: str | None = None
+        self.latest: str | None = None
+        self.edited_at = 0.0
+        self.editor: asyncio.Task | None = None
+        # Set once the caller is done, so the last edit need not wait its turn
+        self.flushing = asyncio.Event()
+
+    @classmethod
+    def from_env(cls, channel: discord.abc.Messageable) -> "SessionPublisher":
+        upload_limit = os.getenv("DISCORD_UPLOAD_LIMIT_BYTES", "")
+        return cls(
+            channel,
+            edit_interval=float(os.getenv("DISCORD_PROGRESS_INTERVAL_SECONDS", "2")),
+            concurrency=int(os.getenv("DISCORD_UPLOAD_CONCURRENCY", "2")),
+            upload_limit=int(upload_limit) if upload_limit.strip() else None,
+        )
+
+    async def _request(self, description: str, send):
+        """Await ``send()``, retrying transient failures with jittered backoff"""
+        for attempt in range(self.attempts):
+            try:
+                return await send()
+            except Exception as e:
+                if attempt == self.attempts - 1 or not _retryable(e):
+                    raise
+                delay = self.backoff * 2**attempt * random.uniform(0.5, 1.5)
+                print(f"Retrying {description} in {delay:.1f}s: {e}")
+                SEND_RETRIES.inc()
+                await asyncio.sleep(delay)
+
+    async def progress(self, text: str) -> None:
+        """Show ``text`` in the progress message, now or at the next edit slot"""
+        self.latest = text
+        if self.message is None:
+            # Created inline, so later updates have something to edit
+            try:
+                self.message = await self._request(
+                    "progress message", lambda: self.channel.send(text)
+                )
+            except Exception as e:
+                print(f"Error posting progress message: {e}")
+                return
+            self.shown = text
+            self.edited_at = time.monotonic()
+        elif self.editor is None or self.editor.done():
+            self.editor = asyncio.create_task(self._edit_soon())
+
+    async def _edit_soon(self) -> None:
+        wait = self.edited_at + self.edit_interval - time.monotonic()
+        if wait > 0:
+            try:
+                await asyncio.wait_for(self.flushing.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+        text = self.latest
+        if text == self.shown:
+            return
+        try:
+            await self._request(
+                "progress edit",
+                lambda: self.message.edit(content=text),  # type: ignore
+            )
+            self.shown = text
+        except Exception as e:
+            print(f"Error updating progress message: {e}")
+        self.edited_at = time.monotonic()
+        if self.latest != self.shown:
+            # Something newer arrived while editing
+            self.editor = asyncio.create_task(self._edit_soon())
+
+    async def flush(self) -> None:
+        """Send any pending progress edit now and wait for it to reach Discord"""
+        self.flushing.set()
+        while self.editor is not None and not self.editor.done():
+            await self.editor
+
+    async def _upload(self, content: str | None, paths: list[str], names: dict) -> None:
+        def send():
+            # Fresh handles per attempt, since a failed upload consumed the old ones
+            files = [discord.File(path, names.get(path)) for path in paths]
+            return self.channel.send(content, files=files)
+
+        async with self.semaphore:
+            await self._request(f"upload of {len(paths)} files", send)
+        UPLOADED_BYTES.inc(sum(os.path.getsize(path) for path in paths))
+
+    async def upload(
+        self, content: str, paths: list[str], names: dict[str, str] | None = None
+    ) -> tuple[list[str], list[str]]:
+        """Post ``content`` with every file in ``paths``
+
+        ``content`` goes with the first message; later ones are numbered
+        parts. ``names`` optionally renames attachments by path. Returns the
+        files too large to send and those whose part still failed after
+        every retry; a failure of the first message raises instead.
+        """
+        names = names or {}
+        packs, too_large = pack_files(paths, self.upload_limit)
+        if not packs:
+            await self._request("results message", lambda: self.channel.send(content))
+            return too_large, []
+        # The summary goes first so it stays above the attachments in the channel
+        await self._upload(content, packs[0], names)
+        results = await asyncio.gather(
+            *(
+                self._upload(f"📎 Part {i + 1}/{len(packs)}", pack, names)
+                for i, pack in enumerate(packs)
+                if i
+            ),
+            return_exceptions=True,
+        )
+        failed = []
+        for pack, result in zip(packs[1:], results):
+            if isinstance(result, Exception):
+                print(f"Error uploading session files: {result}")
+                failed.extend(pack)
+        return too_large, failed
@@ -0,0 +1,265 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from services.archive import ARCHIVE_EXTENSIONS, ArchiveEncoder
+from services.session_index import SessionIndex
+
+DAY = 24 * 60 * 60
+AUDIO_EXTENSIONS = (".wav", ".f32", *ARCHIVE_EXTENSIONS)
+
+
+@dataclass
+class RetentionPolicy:
+    """Ages in days at which a session's audio is compressed and deleted
+
+    ``None`` disables a tier. Transcripts are never deleted. ``quota_bytes``
+    caps a guild's recordings on disk; past it the oldest audio goes first.
+    """
+
+    compress_days: float | None = 7
+    delete_audio_days: float | None = 30
+    quota_bytes: int | None = None
+
+
+def _days(value: str) -> float | None:
+    return float(value) if value.strip() else None
+
+
+def parse_guild_policies(value: str, default: RetentionPolicy) -> dict[int, RetentionPolicy]:
+    """Parse "guild_id:compress_days/delete_audio_days/quota_mb,..."
+
+    Empty fields fall back to the default policy, "-" disables that tier,
+    e.g. "1234:3/14/2000,5678://500".
+    """
+    policies = {}
+    for entry in value.split(","):
+        if ":" not in entry:
+            continue
+        guild_id, fields = entry.split(":", 1)
+        compress, delete, quota = (fields.split("/") + ["", "", ""])[:3]
+        policy = RetentionPolicy(
+            default.compress_days, default.delete_audio_days, default.quota_bytes
+        )
+        if compress.strip():
+            policy.compress_days = None if compress.strip() == "-" else float(compress)
+        if delete.strip():
+            policy.delete_audio_days = None if delete.strip() == "-" else float(delete)
+        if quota.strip():
+            policy.quota_bytes = (
+                None if quota.strip() == "-" else int(float(quota) * 1024 * 1024)
+            )
+        policies[int(guild_id.strip())] = policy
+    return policies
+
+
+def _folder_usage(folder: str) -> tuple[int, int]:
+    """Bytes of audio and of everything else in a session folder"""
+    audio = other = 0
+    try:
+        entries = list(os.scandir(folder))
+    except FileNotFoundError:
+        return 0, 0
+    for entry in entries:
+        if entry.is_file():
+            if entry.name.endswith(AUDIO_EXTENSIONS):
+                audio += entry.stat().st_size
+            else:
+                other += entry.stat().st_size
+    return audio, other
+
+
+def _delete_audio(folder: str) -> int:
+    """Remove every audio file in a session folder and return the bytes freed"""
+    freed = 0
+    if not os.path.isdir(folder):
+        return 0
+    for entry in os.scandir(folder):
+        if entry.is_file() and entry.name.endswith(AUDIO_EXTENSIONS):
+            freed += entry.stat().st_size
+            os.remove(entry.path)
+    return freed
+
+
+class RetentionEngine:
+    """Applies tiered retention policies to recorded sessions on a schedule
+
+    Filesystem work runs in threads and transcoding in ffmpeg child
+    processes, so a run never blocks the event loop. Sessions still being
+    transcribed are skipped until a later run.
+    """
+
+    def __init__(
+        self,
+        index: SessionIndex,
+        archiver: ArchiveEncoder,
+        default: RetentionPolicy,
+        guild_policies: dict[int, RetentionPolicy] | None = None,
+        interval: float = 6 * 60 * 60,
+        active_sessions=lambda: set(),
+    ):
+        self.index = index
+        self.archiver = archiver
+        self.default = default
+        self.guild_policies = guild_policies or {}
+        self.interval = interval
+        self.active_sessions = active_sessions
+        self.last_report: dict | None = None
+        self.running = asyncio.Lock()
+        self.task: asyncio.Task | None = None
+
+    @classmethod
+    def from_env(cls, index: SessionIndex, archiver: ArchiveEncoder, **kwargs):
+        quota = os.getenv("RETENTION_QUOTA_MB", "")
+        default = RetentionPolicy(
+            _days(os.getenv("RETENTION_COMPRESS_DAYS", "7")),
+            _days(os.getenv("RETENTION_DELETE_AUDIO_DAYS", "30")),
+            int(float(quota) * 1024 * 1024) if quota.strip() else None,
+        )
+        return cls(
+            index,
+            archiver,
+            default,
+            parse_guild_policies(os.getenv("RETENTION_GUILD_POLICIES", ""), default),
+            float(os.getenv("RETENTION_INTERVAL_HOURS", "6")) * 60 * 60,
+            **kwargs,
+        )
+
+    def policy_for(self, guild_id: int | None) -> RetentionPolicy:
+        return self.guild_policies.get(guild_id, self.default)  # type: ignore
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop())
+
+    def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                print(f"Error applying retention policies: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run(self, guilds: set | None = None) -> dict:
+        """One pass over every session, or only those of ``guilds``, returning its report"""
+        async with self.running:
+            started = time.perf_counter()
+            report = {
+                "finished_at": None,
+                "seconds": 0.0,
+                "bytes_reclaimed": 0,
+                "compressed": 0,
+                "audio_deleted": 0,
+                "errors": 0,
+            }
+            sessions = await asyncio.to_thread(self.index.sessions_with_audio)
+            if guilds is not None:
+                sessions = [s for s in sessions if s["guild_id"] in guilds]
+            active = self.active_sessions()
+            now = time.time()
+
+            kept = []
+            for session in sessions:
+                if session["name"] in active:
+                    continue
+                age = now - self._started_at(session)
+                policy = self.policy_for(session["guild_id"])
+                try:
+                    delete_after = policy.delete_audio_days
+                    compress_after = policy.compress_days
+                    if delete_after is not None and age >= delete_after * DAY:
+                        await self._delete_session_audio(session, report)
+                        continue
+                    if compress_after is not None and age >= compress_after * DAY:
+                        await self._compress_session(session, report)
+                except Exception as e:
+                    print(f"Error applying retention to session {session['name']}: {e}")
+                    report["errors"] += 1
+                kept.append(session)
+
+            await self._enforce_quotas(kept, report)
+
+            report["seconds"] = time.perf_counter() - started
+            report["finished_at"] = time.time()
+            if guilds is None:
+                self.last_report = report
+            return report
+
+    def _started_at(self, session) -> float:
+        if session["started_at"]:
+            return datetime.fromisoformat(session["started_at"]).timestamp()
+        try:
+            return os.path.getmtime(session["folder"])
+        except FileNotFoundError:
+            return time.time()
+
+    async def _delete_session_audio(self, session, report: dict) -> None:
+        freed = await asyncio.to_thread(_delete_audio, session["folder"])
+        report["bytes_reclaimed"] += freed
+        await asyncio.to_thread(self.index.mark_audio_deleted, session["id"])
+        report["audio_deleted"] += 1
+
+    async def _compress_session(self, session, report: dict) -> None:
+        """Leave only compressed audio in the session
+
+        Sessions are archived as they finish, keeping the WAVs unless
+        ``ARCHIVE_KEEP_ORIGINALS`` is off; this removes them, and compresses
+        recordings whose archiving failed first.
+        """
+        for participant in await asyncio.to_thread(self.index.participants, session["id"]):
+            wav_path = participant["wav_path"]
+            if not wav_path or not os.path.exists(wav_path):
+                continue
+            wav_bytes = os.path.getsize(wav_path)
+            archive_path = participant["archive_path"]
+            if archive_path and os.path.exists(archive_path):
+                archive_bytes = participant["archive_bytes"]
+                freed = wav_bytes
+            else:
+                archive_path = await self.archiver.compress(wav_path)
+                archive_bytes = os.path.getsize(archive_path)
+                freed = wav_bytes - archive_bytes
+            # The tier is when originals go, even if the archiver keeps them
+            if os.path.exists(wav_path):
+                await asyncio.to_thread(os.remove, wav_path)
+            await asyncio.to_thread(
+                self.index.set_archive,
+                session["id"],
+                participant["user_id"],
+                archive_path,
+                archive_bytes,
+                True,
+            )
+            report["bytes_reclaimed"] += freed
+            report["compressed"] += 1
+
+    async def _enforce_quotas(self, sessions: list, report: dict) -> None:
+        by_guild = {}
+        for session in sessions:
+            if self.policy_for(session["guild_id"]).quota_bytes is not None:
+                by_guild.setdefault(session["guild_id"], []).append(session)
+
+        for guild_id, guild_sessions in by_guild.items():
+            quota = self.policy_for(guild_id).quota_bytes
+            usage = await asyncio.to_thread(
+                lambda: [_folder_usage(s["folder"]) for s in guild_sessions]
+            )
+            total = sum(audio + other for audio, other in usage)
+            # Oldest first; transcripts are kept even if that leaves the guild over
+            for session, (audio, _) in zip(guild_sessions, usage):
+                if total <= quota:  # type: ignore
+                    break
+                if not audio:
+                    continue
+                freed = await asyncio.to_thread(_delete_audio, session["folder"])
+                await asyncio.to_thread(self.index.mark_audio_deleted, session["id"])
+                report["bytes_reclaimed"] += freed
+                report["audio_deleted"] += 1
+                total -= freed
+            if total > quota:  # type: ignore
+                print(f"Guild {guild_id} is over its disk quota with transcripts alone")
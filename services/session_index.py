@@ -0,0 +1,368 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from collections.abc import Collection
+
+# 48 kHz stereo s16le, as Discord records it
+BYTES_PER_SECOND = 48000 * 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    folder TEXT NOT NULL,
+    guild_id INTEGER,
+    channel_id INTEGER,
+    started_at TEXT,
+    duration REAL NOT NULL DEFAULT 0,
+    audio_bytes INTEGER NOT NULL DEFAULT 0,
+    transcript_path TEXT,
+    archive_bytes INTEGER NOT NULL DEFAULT 0,
+    audio_deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_by_guild ON sessions (guild_id, name);
+
+CREATE TABLE IF NOT EXISTS participants (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL,
+    name TEXT,
+    audio_seconds REAL NOT NULL DEFAULT 0,
+    speech_seconds REAL NOT NULL DEFAULT 0,
+    wav_path TEXT,
+    wav_bytes INTEGER NOT NULL DEFAULT 0,
+    transcript_path TEXT,
+    archive_path TEXT,
+    archive_bytes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, user_id)
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5 (
+    text,
+    speaker,
+    session_id UNINDEXED,
+    user_id UNINDEXED,
+    start_ms UNINDEXED,
+    end_ms UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
+
+# Columns added after the first release, for databases created before them
+MIGRATIONS = [
+    ("sessions", "archive_bytes", "INTEGER NOT NULL DEFAULT 0"),
+    ("participants", "archive_path", "TEXT"),
+    ("participants", "archive_bytes", "INTEGER NOT NULL DEFAULT 0"),
+    ("sessions", "audio_deleted", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+
+def session_started_at(name: str) -> str | None:
+    """ISO start time of a session, from the timestamp its name begins with"""
+    try:
+        return datetime.strptime(name[:15], "%Y%m%d_%H%M%S").isoformat()
+    except ValueError:
+        return None
+
+
+def _match_query(query: str) -> str:
+    """Quote every word so user input is never parsed as FTS5 syntax"""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+
+class SessionIndex:
+    """SQLite manifest of recorded sessions, so commands never walk recordings/
+
+    Calls are blocking; cogs run them through ``asyncio.to_thread``. Sessions
+    recorded before the index existed have no guild and are visible to every
+    guild, as they were before.
+    """
+
+    def __init__(self, db_path: str):
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA foreign_keys=ON")
+            self.db.executescript(SCHEMA)
+            for table, column, definition in MIGRATIONS:
+                columns = [row[1] for row in self.db.execute(f"PRAGMA table_info({table})")]
+                if column not in columns:
+                    self.db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def add_session(
+        self,
+        folder: str,
+        guild_id: int | None,
+        channel_id: int | None,
+        started_at: str | None,
+        duration: float,
+        transcript_path: str | None,
+        participants: list[dict],
+    ) -> int:
+        """Record a finished session; ``participants`` rows use the participants columns"""
+        name = os.path.basename(folder).removeprefix("session_")
+        with self.lock, self.db:
+            self._delete(name)
+            cursor = self.db.execute(
+                "INSERT INTO sessions (name, folder, guild_id, channel_id, started_at,"
+                " duration, audio_bytes, transcript_path, archive_bytes)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    name,
+                    folder,
+                    guild_id,
+                    channel_id,
+                    started_at,
+                    duration,
+                    sum(p.get("wav_bytes", 0) for p in participants),
+                    transcript_path,
+                    sum(p.get("archive_bytes", 0) for p in participants),
+                ),
+            )
+            session_id = cursor.lastrowid
+            self.db.executemany(
+                "INSERT INTO participants (session_id, user_id, name, audio_seconds,"
+                " speech_seconds, wav_path, wav_bytes, transcript_path, archive_path,"
+                " archive_bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        session_id,
+                        p["user_id"],
+                        p.get("name"),
+                        p.get("audio_seconds", 0),
+                        p.get("speech_seconds", 0),
+                        p.get("wav_path"),
+                        p.get("wav_bytes", 0),
+                        p.get("transcript_path"),
+                        p.get("archive_path"),
+                        p.get("archive_bytes", 0),
+                    )
+                    for p in participants
+                ],
+            )
+        return session_id  # type: ignore
+
+    def _delete(self, name: str) -> None:
+        # The FTS table has no foreign keys, so clear its rows by hand
+        self.db.execute(
+            "DELETE FROM segments WHERE session_id IN"
+            " (SELECT id FROM sessions WHERE name = ?)",
+            (name,),
+        )
+        self.db.execute("DELETE FROM sessions WHERE name = ?", (name,))
+
+    def set_archive(
+        self,
+        session_id: int,
+        user_id: int,
+        archive_path: str,
+        archive_bytes: int,
+        wav_removed: bool,
+    ) -> None:
+        """Record a participant's compressed audio; the original size stays in wav_bytes"""
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE participants SET archive_path = ?, archive_bytes = ?,"
+                " wav_path = CASE WHEN ? THEN NULL ELSE wav_path END"
+                " WHERE session_id = ? AND user_id = ?",
+                (archive_path, archive_bytes, wav_removed, session_id, user_id),
+            )
+            self.db.execute(
+                "UPDATE sessions SET archive_bytes = (SELECT COALESCE(SUM(archive_bytes), 0)"
+                " FROM participants WHERE session_id = ?) WHERE id = ?",
+                (session_id, session_id),
+            )
+
+    def sessions_with_audio(self) -> list[sqlite3.Row]:
+        """Every session whose audio is still on disk, oldest first"""
+        with self.lock:
+            return self.db.execute(
+                "SELECT * FROM sessions WHERE audio_deleted = 0 ORDER BY name"
+            ).fetchall()
+
+    def mark_audio_deleted(self, session_id: int) -> None:
+        """Forget a session's audio files; transcripts and segments stay searchable"""
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE participants SET wav_path = NULL, archive_path = NULL,"
+                " archive_bytes = 0 WHERE session_id = ?",
+                (session_id,),
+            )
+            self.db.execute(
+                "UPDATE sessions SET audio_deleted = 1, archive_bytes = 0 WHERE id = ?",
+                (session_id,),
+            )
+
+    def remove_session(self, name: str) -> None:
+        with self.lock, self.db:
+            self._delete(name)
+
+    def add_segments(self, session_id: int, segments) -> int:
+        """Index transcript segments (dicts as written to segments.jsonl) for search"""
+        rows = [
+            (
+                segment["text"],
+                segment["speaker"],
+                session_id,
+                segment.get("user_id"),
+                int(segment["start"] * 1000),
+                int(segment["end"] * 1000),
+            )
+            for segment in segments
+        ]
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM segments WHERE session_id = ?", (session_id,))
+            self.db.executemany(
+                "INSERT INTO segments (text, speaker, session_id, user_id, start_ms,"
+                " end_ms) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def add_segments_file(self, session_id: int, segments_path: str) -> int:
+        with open(segments_path, encoding="utf-8") as f:
+            return self.add_segments(
+                session_id, (json.loads(line) for line in f if line.strip())
+            )
+
+    def search(
+        self, guild_id: int | None, query: str, limit: int = 10
+    ) -> list[sqlite3.Row]:
+        """Best-matching segments first, with a highlighted snippet"""
+        match = _match_query(query)
+        if not match:
+            return []
+        with self.lock:
+            return self.db.execute(
+                "SELECT s.name AS session, segments.speaker, segments.user_id,"
+                " segments.start_ms, segments.end_ms,"
+                " snippet(segments, 0, '**', '**', '…', 16) AS snippet"
+                " FROM segments JOIN sessions s ON s.id = segments.session_id"
+                " WHERE segments MATCH ? AND (s.guild_id = ? OR s.guild_id IS NULL)"
+                " ORDER BY bm25(segments) LIMIT ?",
+                (match, guild_id, limit),
+            ).fetchall()
+
+    def unsearchable_sessions(self) -> list[sqlite3.Row]:
+        """Sessions with no indexed segments yet"""
+        with self.lock:
+            return self.db.execute(
+                "SELECT * FROM sessions WHERE id NOT IN"
+                " (SELECT DISTINCT session_id FROM segments) ORDER BY name"
+            ).fetchall()
+
+    def list_sessions(
+        self,
+        guild_id: int | None,
+        limit: int = 10,
+        offset: int = 0,
+        transcribed_only: bool = False,
+    ) -> list[sqlite3.Row]:
+        """Newest first, with participant counts"""
+        where = "(s.guild_id = ? OR s.guild_id IS NULL)"
+        if transcribed_only:
+            where += " AND s.transcript_path IS NOT NULL"
+        with self.lock:
+            return self.db.execute(
+                "SELECT s.*, COUNT(p.user_id) AS participant_count"
+                " FROM sessions s LEFT JOIN participants p ON p.session_id = s.id"
+                f" WHERE {where} GROUP BY s.id ORDER BY s.name DESC LIMIT ? OFFSET ?",
+                (guild_id, limit, offset),
+            ).fetchall()
+
+    def count_sessions(self, guild_id: int | None, transcribed_only: bool = False) -> int:
+        where = "(guild_id = ? OR guild_id IS NULL)"
+        if transcribed_only:
+            where += " AND transcript_path IS NOT NULL"
+        with self.lock:
+            return self.db.execute(
+                f"SELECT COUNT(*) FROM sessions WHERE {where}", (guild_id,)
+            ).fetchone()[0]
+
+    def find_session(self, guild_id: int | None, query: str) -> sqlite3.Row | None:
+        """Exact session name, or the newest one starting with ``query``"""
+        query = query.strip().removeprefix("session_")
+        with self.lock:
+            # A range scan keeps prefix matching on the name index
+            return self.db.execute(
+                "SELECT * FROM sessions WHERE (guild_id = ? OR guild_id IS NULL)"
+                " AND name >= ? AND name < ? ORDER BY name = ? DESC, name DESC LIMIT 1",
+                (guild_id, query, query + "\uffff", query),
+            ).fetchone()
+
+    def participants(self, session_id: int) -> list[sqlite3.Row]:
+        with self.lock:
+            return self.db.execute(
+                "SELECT * FROM participants WHERE session_id = ? ORDER BY name",
+                (session_id,),
+            ).fetchall()
+
+    def import_folders(
+        self,
+        recordings_dir: str,
+        skip: Collection[str] = frozenset(),
+        force: bool = False,
+    ) -> int:
+        """One-off scan that indexes session folders recorded before the index existed
+
+        Runs once per index unless ``force``d. Imported sessions have no
+        guild and are visible everywhere, so sessions named in ``skip``
+        (the job queue's, which finish_session indexes itself) are left out.
+        """
+        with self.lock:
+            if not force and self.db.execute("PRAGMA user_version").fetchone()[0]:
+                return 0
+            known = {row[0] for row in self.db.execute("SELECT name FROM sessions")}
+
+        imported = 0
+        for entry in os.scandir(recordings_dir):
+            name = entry.name.removeprefix("session_")
+            if (
+                not entry.is_dir()
+                or not entry.name.startswith("session_")
+                or name in known
+                or name in skip
+            ):
+                continue
+
+            participants = []
+            for file in os.scandir(entry.path):
+                stem, ext = os.path.splitext(file.name)
+                username, _, user_id = stem.rpartition("_")
+                if ext == ".wav" and user_id.isdigit():
+                    wav_bytes = file.stat().st_size
+                    transcript_path = os.path.join(
+                        entry.path, f"{stem}_transcription.txt"
+                    )
+                    participants.append(
+                        {
+                            "user_id": int(user_id),
+                            "name": username,
+                            "audio_seconds": wav_bytes / BYTES_PER_SECOND,
+                            "wav_path": file.path,
+                            "wav_bytes": wav_bytes,
+                            "transcript_path": transcript_path
+                            if os.path.exists(transcript_path)
+                            else None,
+                        }
+                    )
+
+            started_at = session_started_at(name)
+            combined = os.path.join(entry.path, "combined_transcript.txt")
+            self.add_session(
+                entry.path,
+                None,
+                None,
+                started_at,
+                max((p["audio_seconds"] for p in participants), default=0),
+                combined if os.path.exists(combined) else None,
+                participants,
+            )
+            imported += 1
+
+        with self.lock, self.db:
+            self.db.execute("PRAGMA user_version = 1")
+        return imported
@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+import wave
+import numpy as np
+from discord.sinks import Filters, Sink
+from discord.opus import Decoder
+from services.audio import SAMPLE_RATE, Downsampler, quietest_point
+from services.metrics import PIPELINE_SECONDS
+
+BYTES_PER_SECOND = Decoder.SAMPLING_RATE * Decoder.SAMPLE_SIZE
+
+
+class DiskAudio:
+    """One user's audio, streamed to disk through bounded buffers
+
+    Two files are kept: the archival 48 kHz stereo WAV at ``path`` and the
+    16 kHz mono float32 transcription stream at ``speech_path``.
+    """
+
+    def __init__(self, path: str, speech_path: str, buffer_size: int):
+        self.path = path
+        self.file = open(path, "wb", buffering=buffer_size)
+        self.wav = wave.open(self.file, "wb")
+        self.wav.setnchannels(Decoder.CHANNELS)
+        self.wav.setsampwidth(Decoder.SAMPLE_SIZE // Decoder.CHANNELS)
+        self.wav.setframerate(Decoder.SAMPLING_RATE)
+        self.speech_path = speech_path
+        self.speech_file = open(speech_path, "wb", buffering=buffer_size)
+        self.downsampler = Downsampler()
+        self.bytes_written = 0
+        self.finished = False
+
+    def write(self, data) -> np.ndarray:
+        """Write a PCM chunk and return its 16 kHz mono samples"""
+        self.wav.writeframesraw(data)
+        self.bytes_written += len(data)
+        samples = self.downsampler.process(data)
+        self.speech_file.write(samples.tobytes())
+        return samples
+
+    def cleanup(self) -> None:
+        # Closing the wave writer patches the header with the final sizes
+        self.wav.close()
+        self.file.close()
+        self.speech_file.close()
+        self.finished = True
+
+    @property
+    def duration(self) -> float:
+        return self.bytes_written / BYTES_PER_SECOND
+
+
+class StreamingSink(Sink):
+    """Sink that spills every user's audio to disk and hands it out in windows
+
+    Memory stays flat however long the session runs: each user only holds
+    write buffers and the current window. ``on_window(user_id, index,
+    offset_seconds, samples)`` is called from the voice receive thread with
+    16 kHz mono float32 samples roughly every ``window_seconds`` of a user's
+    audio, cut at a pause near the end of the window, and once more for the
+    remainder when the recording stops. ``on_start(user_id, offset_seconds)``
+    is called from the same thread when a user's first audio arrives.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        on_window,
+        window_seconds: float = 30,
+        buffer_size: int = 1024 * 1024,
+        *,
+        on_start=None,
+        filters=None,
+    ):
+        super().__init__(filters=filters)
+        self.encoding = "wav"
+        self.folder = folder
+        self.buffer_size = buffer_size
+        self.on_window = on_window
+        self.on_start = on_start
+        self.window_samples = int(window_seconds * SAMPLE_RATE)
+        self.windows = {}
+        self.buffered = {}
+        self.window_counts = {}
+        self.emitted = {}
+        # Seconds from the start of the recording to each user's first audio
+        self.start_offsets = {}
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def init(self, vc):
+        self.started = time.monotonic()
+        super().init(vc)
+
+    @Filters.container
+    def write(self, data, user):
+        with self.lock:
+            if self.finished:
+                return
+            if user not in self.audio_data:
+                self.start_offsets[user] = time.monotonic() - self.started
+                if self.on_start is not None:
+                    self.on_start(user, self.start_offsets[user])
+                self.audio_data[user] = DiskAudio(
+                    os.path.join(self.folder, f"{user}.wav"),
+                    os.path.join(self.folder, f"{user}_16k.f32"),
+                    self.buffer_size,
+                )
+            samples = self.audio_data[user].write(data)
+
+            window = self.windows.setdefault(user, [])
+            window.append(samples)
+            self.buffered[user] = self.buffered.get(user, 0) + len(samples)
+            if self.buffered[user] >= self.window_samples:
+                pending = np.concatenate(window)
+                window.clear()
+                while len(pending) >= self.window_samples:
+                    # Cut at a pause in the last quarter rather than mid-word
+                    cut = quietest_point(
+                        pending, self.window_samples * 3 // 4, self.window_samples
+                    )
+                    self._emit(user, pending[:cut])
+                    pending = pending[cut:]
+                if len(pending):
+                    window.append(pending)
+                self.buffered[user] = len(pending)
+
+    def _emit(self, user, samples: np.ndarray) -> None:
+        # Jobs may be resumed from the file after a crash, so make it durable
+        self.audio_data[user].speech_file.flush()
+        index = self.window_counts.get(user, 0)
+        self.window_counts[user] = index + 1
+        offset = self.emitted.get(user, 0) / SAMPLE_RATE
+        self.emitted[user] = self.emitted.get(user, 0) + len(samples)
+        self.on_window(user, index, offset, samples)
+
+    def cleanup(self):
+        with self.lock, PIPELINE_SECONDS.time(stage="flush_audio"):
+            self.finished = True
+            # Whatever is left is the only audio still waiting to be transcribed;
+            # emit it while the files are open, since _emit flushes them
+            for user, window in self.windows.items():
+                if window:
+                    self._emit(user, np.concatenate(window))
+            self.windows.clear()
+            self.buffered.clear()
+            for audio in self.audio_data.values():
+                audio.cleanup()
+
+
+def repair_wav_header(path: str) -> None:
+    """Fix the sizes in a WAV header left unpatched when the bot died mid-recording"""
+    size = os.path.getsize(path)
+    if size < 44:
+        return
+    with open(path, "r+b") as f:
+        f.seek(4)
+        f.write((size - 8).to_bytes(4, "little"))
+        f.seek(40)
+        f.write((size - 44).to_bytes(4, "little"))
@@ -0,0 +1,433 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from services.audio import SAMPLE_RATE
+from services.backends import get_backend
+from services.ipc import ProtocolError, parse_address, read_message, write_message
+from services.whisper_models import ModelManager
+
+# Each worker process keeps its own model cache, created by the pool initializer
+_worker_models: ModelManager | None = None
+
+
+def _init_worker(pinned_model: str, idle_seconds: float, backend: str) -> None:
+    global _worker_models
+    _worker_models = ModelManager(
+        pinned=pinned_model, idle_seconds=idle_seconds, backend=get_backend(backend)
+    )
+    _worker_models.start_evictor()
+
+
+def _worker_state() -> tuple[int, list[str]]:
+    return os.getpid(), _worker_models.loaded()  # type: ignore
+
+
+def _transcribe_batch(batch: list, model_name: str) -> tuple[list[dict], tuple]:
+    # 16 kHz mono float32 goes straight into the model, no ffmpeg decode
+    model = _worker_models.get(model_name)  # type: ignore
+    return _worker_models.backend.transcribe_batch(model, batch), _worker_state()  # type: ignore
+
+
+def _probe_state(hold: float) -> tuple:
+    # Holding the worker briefly spreads concurrent probes across the pool
+    time.sleep(hold)
+    return _worker_state()
+
+
+def _warm_up(model_name: str) -> tuple[float, tuple]:
+    _worker_models.get(model_name)  # type: ignore
+    return _worker_models.load_times.get(model_name, 0.0), _worker_state()  # type: ignore
+
+
+def _parse_guild_models(value: str) -> dict[int, str]:
+    """Parse "guild_id:model,guild_id:model" into a mapping"""
+    models = {}
+    for entry in value.split(","):
+        if ":" in entry:
+            guild_id, model_name = entry.split(":", 1)
+            models[int(guild_id.strip())] = model_name.strip()
+    return models
+
+
+class Transcriber:
+    """Shared bookkeeping for anything that runs Whisper on the bot's behalf"""
+
+    def __init__(
+        self,
+        model_name: str = "base",
+        workers: int = 1,
+        guild_models: dict[int, str] | None = None,
+    ):
+        self.model_name = model_name
+        self.guild_models = guild_models or {}
+        self.workers = workers
+        # Part of every cache key, so results from different backends never mix
+        self.backend: str | None = None
+        self.worker_models: dict[int, list[str]] = {}
+        self.warming: set[str] = set()
+        self.load_times: dict[str, float] = {}
+
+    def model_for(self, guild_id: int | None) -> str:
+        return self.guild_models.get(guild_id, self.model_name)  # type: ignore
+
+    def _record_state(self, state) -> None:
+        pid, loaded = state
+        self.worker_models[pid] = loaded
+
+    def _record_warm_up(self, model_name: str, results: list) -> None:
+        for result in results:
+            if isinstance(result, BaseException):
+                print(f"Error warming up Whisper model '{model_name}': {result}")
+                continue
+            load_time, state = result
+            self._record_state(state)
+            if load_time:
+                self.load_times[model_name] = load_time
+
+    async def transcribe(self, samples, model_name: str | None = None) -> dict:
+        """Transcribe 16 kHz mono float32 samples"""
+        return (await self.transcribe_batch([samples], model_name))[0]
+
+    async def transcribe_batch(
+        self, batch: list, model_name: str | None = None
+    ) -> list[dict]:
+        """Transcribe several chunks in one model pass, results in the same order"""
+        raise NotImplementedError
+
+    async def warm_up(self, model_name: str | None = None) -> None:
+        raise NotImplementedError
+
+    async def refresh_status(self, timeout: float = 2.0) -> None:
+        """Ask the workers what they have loaded now, for an up-to-date ``status``
+
+        Models are evicted inside the workers without telling the bot, so
+        the state they last reported alongside a result can be stale.
+        Workers too busy to answer within ``timeout`` keep their last report.
+        """
+
+    def status(self) -> dict[str, int]:
+        """Number of workers that reported each model as loaded"""
+        counts = {}
+        for loaded in self.worker_models.values():
+            for name in loaded:
+                counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def shutdown(self) -> None:
+        pass
+
+
+class TranscriptionPool(Transcriber):
+    """Runs Whisper in a pool of local worker processes so the event loop never blocks"""
+
+    def __init__(
+        self,
+        model_name: str = "base",
+        workers: int | None = None,
+        guild_models: dict[int, str] | None = None,
+        idle_seconds: float = 1800,
+        backend: str = "whisper",
+    ):
+        # Fail here, not in every worker's initializer
+        get_backend(backend)
+        super().__init__(
+            model_name, workers or max(1, (os.cpu_count() or 2) // 2), guild_models
+        )
+        self.initargs = (model_name, idle_seconds, backend)
+        self.executor = self._new_executor()
+        self.backend = backend
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Models are loaded lazily inside the workers, never at import time
+        # spawn keeps torch and the gateway's threads out of the children
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=self.initargs,
+        )
+
+    async def _run(self, func, *args):
+        """Run ``func`` in a worker, replacing the pool once if a worker has died
+
+        A worker killed by the OOM killer or a crash in torch breaks the
+        whole executor; without a new one every later call would fail.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # Concurrent callers share one replacement
+            if self.executor is executor:
+                print("A transcription worker died; restarting the worker pool")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self._new_executor()
+                self.worker_models.clear()
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    @classmethod
+    def from_env(cls) -> "TranscriptionPool":
+        workers = os.getenv("TRANSCRIPTION_WORKERS")
+        return cls(
+            model_name=os.getenv("WHISPER_MODEL", "base"),
+            workers=int(workers) if workers else None,
+            guild_models=_parse_guild_models(os.getenv("WHISPER_GUILD_MODELS", "")),
+            idle_seconds=float(os.getenv("WHISPER_MODEL_IDLE_SECONDS", "1800")),
+            backend=os.getenv("WHISPER_BACKEND", "whisper"),
+        )
+
+    async def refresh_status(self, timeout: float = 2.0) -> None:
+        probes = [
+            asyncio.ensure_future(self._run(_probe_state, 0.1))
+            for _ in range(self.workers)
+        ]
+        done, pending = await asyncio.wait(probes, timeout=timeout)
+        for probe in pending:
+            # Still queued behind a batch; it answers harmlessly later
+            probe.add_done_callback(lambda p: p.exception())
+        for probe in done:
+            if probe.exception() is None:
+                self._record_state(probe.result())
+
+    async def transcribe_batch(
+        self, batch: list, model_name: str | None = None
+    ) -> list[dict]:
+        results, state = await self._run(
+            _transcribe_batch, batch, model_name or self.model_name
+        )
+        self._record_state(state)
+        return results
+
+    async def warm_up(self, model_name: str | None = None) -> None:
+        """Load a model in every worker in the background"""
+        model_name = model_name or self.model_name
+        if model_name in self.warming:
+            return
+        self.warming.add(model_name)
+        try:
+            # One task per worker; each blocks while loading so they spread out
+            results = await asyncio.gather(
+                *(self._run(_warm_up, model_name) for _ in range(self.workers)),
+                return_exceptions=True,
+            )
+            self._record_warm_up(model_name, results)
+        finally:
+            self.warming.discard(model_name)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class WorkerConnection:
+    """One persistent connection to a standalone worker (see worker.py)"""
+
+    def __init__(self, address: str, token: str | None = None):
+        self.address = address
+        self.host, self.port = parse_address(address)
+        self.token = token
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+        # Requests on one connection go strictly one after another
+        self.lock = asyncio.Lock()
+        self.in_flight = 0
+        self.next_id = 0
+        self.down_until = 0.0
+
+    async def request(self, header: dict, payload: bytes = b"") -> tuple[dict, bytes]:
+        self.in_flight += 1
+        try:
+            async with self.lock:
+                if self.writer is None:
+                    self.reader, self.writer = await asyncio.open_connection(
+                        self.host, self.port
+                    )
+                self.next_id += 1
+                if self.token:
+                    header = {**header, "token": self.token}
+                try:
+                    await write_message(self.writer, {**header, "id": self.next_id}, payload)
+                    response, body = await read_message(self.reader)  # type: ignore
+                except BaseException:
+                    # A half-finished exchange leaves the stream unusable
+                    self.close()
+                    raise
+        finally:
+            self.in_flight -= 1
+        if not response.get("ok"):
+            raise RuntimeError(f"Worker {self.address}: {response.get('error')}")
+        return response, body
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class RemoteTranscriber(Transcriber):
+    """Sends audio to standalone worker processes over the local IPC protocol
+
+    The bot process never imports torch; workers can be restarted, scaled or
+    moved to another host without touching the gateway connection. A request
+    that fails because its worker went away is retried on another one.
+    """
+
+    def __init__(
+        self,
+        addresses: list[str],
+        model_name: str = "base",
+        guild_models: dict[int, str] | None = None,
+        token: str | None = None,
+        retry_seconds: float = 5,
+        backend: str | None = None,
+    ):
+        super().__init__(model_name, len(addresses), guild_models)
+        # What the workers are configured with, until they report their own
+        self.backend = backend
+        self.connections = [WorkerConnection(address, token) for address in addresses]
+        self.retry_seconds = retry_seconds
+
+    @classmethod
+    def from_env(cls) -> "RemoteTranscriber":
+        return cls(
+            addresses=[
+                address.strip()
+                for address in os.getenv("TRANSCRIPTION_WORKER_ADDRESSES", "").split(",")
+                if address.strip()
+            ],
+            model_name=os.getenv("WHISPER_MODEL", "base"),
+            guild_models=_parse_guild_models(os.getenv("WHISPER_GUILD_MODELS", "")),
+            token=os.getenv("TRANSCRIPTION_WORKER_TOKEN") or None,
+            backend=os.getenv("WHISPER_BACKEND", "whisper"),
+        )
+
+    def _record_remote_state(self, connection: WorkerConnection, state: dict) -> None:
+        # A restarted worker answers with a new pid; forget the old one
+        for key in [k for k in self.worker_models if k[0] == connection.address]:  # type: ignore
+            del self.worker_models[key]
+        self.worker_models[(connection.address, state["pid"])] = state["loaded"]  # type: ignore
+        self.backend = state.get("backend", self.backend)
+
+    def _pick(self, exclude: set) -> WorkerConnection | None:
+        now = time.monotonic()
+        candidates = [c for c in self.connections if c not in exclude]
+        if not candidates:
+            return None
+        # Least busy healthy worker; fall back to ones marked down if nothing else is left
+        healthy = [c for c in candidates if c.down_until <= now] or candidates
+        return min(healthy, key=lambda c: c.in_flight)
+
+    async def _request(self, header: dict, payload: bytes = b"") -> dict:
+        tried = set()
+        while True:
+            connection = self._pick(tried)
+            if connection is None:
+                raise ConnectionError("No transcription worker is reachable")
+            tried.add(connection)
+            try:
+                response, _ = await connection.request(header, payload)
+            except (OSError, asyncio.IncompleteReadError, ProtocolError) as e:
+                print(f"Transcription worker {connection.address} unavailable: {e}")
+                connection.down_until = time.monotonic() + self.retry_seconds
+                continue
+            state = response.get("state")
+            if state:
+                self._record_remote_state(connection, state)
+            return response
+
+    async def transcribe_batch(
+        self, batch: list, model_name: str | None = None
+    ) -> list[dict]:
+        # The chunks travel back to back in one payload, split by their lengths
+        batch = [np.ascontiguousarray(samples, dtype=np.float32) for samples in batch]
+        response = await self._request(
+            {
+                "op": "transcribe",
+                "model": model_name or self.model_name,
+                "lengths": [len(samples) for samples in batch],
+            },
+            b"".join(samples.tobytes() for samples in batch),
+        )
+        return response["results"]
+
+    async def refresh_status(self, timeout: float = 2.0) -> None:
+        async def ask(connection: WorkerConnection):
+            response, _ = await asyncio.wait_for(
+                connection.request({"op": "status"}), timeout
+            )
+            self._record_remote_state(connection, response["state"])
+
+        now = time.monotonic()
+        await asyncio.gather(
+            *(ask(c) for c in self.connections if c.down_until <= now),
+            return_exceptions=True,
+        )
+
+    async def _warm_one(self, connection: WorkerConnection, model_name: str):
+        response, _ = await connection.request({"op": "warm_up", "model": model_name})
+        state = response["state"]
+        return response["load_time"], ((connection.address, state["pid"]), state["loaded"])
+
+    async def warm_up(self, model_name: str | None = None) -> None:
+        """Ask every worker to load a model"""
+        model_name = model_name or self.model_name
+        if model_name in self.warming:
+            return
+        self.warming.add(model_name)
+        try:
+            results = await asyncio.gather(
+                *(self._warm_one(c, model_name) for c in self.connections),
+                return_exceptions=True,
+            )
+            self._record_warm_up(model_name, results)
+        finally:
+            self.warming.discard(model_name)
+
+    def shutdown(self) -> None:
+        for connection in self.connections:
+            connection.close()
+
+
+def transcriber_from_env() -> Transcriber:
+    """Remote workers when TRANSCRIPTION_WORKER_ADDRESSES is set, else a local pool"""
+    if os.getenv("TRANSCRIPTION_WORKER_ADDRESSES", "").strip():
+        return RemoteTranscriber.from_env()
+    return TranscriptionPool.from_env()
+
+
+def chunk_pieces(ranges: list) -> list[tuple[float, float, float]]:
+    """Describe sample ranges packed back to back into one chunk
+
+    Returns ``(chunk_start, track_start, length)`` in seconds for each range.
+    """
+    pieces = []
+    position = 0
+    for start, end in ranges:
+        pieces.append(
+            (position / SAMPLE_RATE, start / SAMPLE_RATE, (end - start) / SAMPLE_RATE)
+        )
+        position += end - start
+    return pieces
+
+
+def remap_segments(result: dict, pieces: list[tuple[float, float, float]]) -> list:
+    """Map segment times in a packed chunk back onto the original track"""
+    starts = [chunk_start for chunk_start, _, _ in pieces]
+
+    def remap(t: float) -> float:
+        chunk_start, track_start, length = pieces[max(0, bisect_right(starts, t) - 1)]
+        return track_start + min(max(t - chunk_start, 0.0), length)
+
+    return [
+        {
+            "start": remap(segment["start"]),
+            "end": remap(segment["end"]),
+            "text": segment["text"],
+        }
+        for segment in result.get("segments", [])
+    ]
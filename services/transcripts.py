@@ -0,0 +1,40 @@
+import heapq
+import json
+from collections.abc import Iterable, Iterator
+
+
+def format_timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def merge_segments(streams: list[Iterable[dict]]) -> Iterator[dict]:
+    """Lazily merge per-speaker segment streams (each sorted by start) into spoken order"""
+    return heapq.merge(*streams, key=lambda segment: segment["start"])
+
+
+def speaker_segments(result: dict, user_id: int, speaker: str, offset: float = 0.0):
+    """Yield a user's Whisper segments on the session timeline"""
+    for segment in result.get("segments", []):
+        text = segment["text"].strip()
+        if text:
+            yield {
+                "start": round(segment["start"] + offset, 3),
+                "end": round(segment["end"] + offset, 3),
+                "user_id": user_id,
+                "speaker": speaker,
+                "text": text,
+                "model": segment.get("model"),
+            }
+
+
+def write_transcript(segments, text_file, jsonl_file) -> int:
+    """Write merged segments as readable lines and as JSONL, returning the count"""
+    count = 0
+    for segment in segments:
+        text_file.write(
+            f"[{format_timestamp(segment['start'])}] {segment['speaker']}: {segment['text']}\n"
+        )
+        jsonl_file.write(json.dumps(segment, ensure_ascii=False) + "\n")
+        count += 1
+    return count
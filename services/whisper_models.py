@@ -0,0 +1,74 @@
+import threading
+import time
+from services.backends import WhisperBackend
+
+
+class ModelManager:
+    """Loads Whisper models on first use, caches them by name and evicts idle ones"""
+
+    def __init__(
+        self,
+        pinned: str | None = None,
+        idle_seconds: float = 1800,
+        backend: WhisperBackend | None = None,
+    ):
+        self.pinned = pinned
+        self.backend = backend or WhisperBackend()
+        self.idle_seconds = idle_seconds
+        self.models = {}
+        self.last_used = {}
+        self.load_times = {}
+        # Guards the dicts only; loads take the model's own lock, so status
+        # calls and other models are never stuck behind a slow load
+        self.lock = threading.Lock()
+        self.load_locks: dict[str, threading.Lock] = {}
+
+    def get(self, name: str):
+        with self.lock:
+            model = self.models.get(name)
+            if model is not None:
+                self.last_used[name] = time.monotonic()
+                return model
+            load_lock = self.load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            # Whoever held the load lock before us may have loaded it already
+            with self.lock:
+                model = self.models.get(name)
+            if model is None:
+                started = time.perf_counter()
+                model = self.backend.load(name)
+                load_time = time.perf_counter() - started
+                with self.lock:
+                    self.load_times[name] = load_time
+                    self.models[name] = model
+        with self.lock:
+            self.last_used[name] = time.monotonic()
+        return model
+
+    def evict_idle(self) -> list[str]:
+        now = time.monotonic()
+        evicted = []
+        with self.lock:
+            for name, used in list(self.last_used.items()):
+                if name != self.pinned and now - used > self.idle_seconds:
+                    del self.models[name]
+                    del self.last_used[name]
+                    evicted.append(name)
+        if evicted:
+            import gc
+
+            gc.collect()
+        return evicted
+
+    def loaded(self) -> list[str]:
+        with self.lock:
+            return sorted(self.models)
+
+    def start_evictor(self, interval: float = 60) -> None:
+        def run():
+            while True:
+                time.sleep(interval)
+                self.evict_idle()
+
+        threading.Thread(target=run, name="model-evictor", daemon=True).start()
@@ -0,0 +1,115 @@
+"""Standalone transcription worker
+
+Loads Whisper models and serves transcription requests over a local socket,
+so the gateway bot never runs torch itself. Run several per host (or across
+hosts) and list them in TRANSCRIPTION_WORKER_ADDRESSES.
+
+Usage: python worker.py [host:port]
+"""
+
+import asyncio
+import os
+import sys
+import numpy as np
+from dotenv import load_dotenv
+from services.backends import get_backend
+from services.ipc import ProtocolError, parse_address, read_message, write_message
+from services.whisper_models import ModelManager
+
+
+class Worker:
+    def __init__(self, models: ModelManager, token: str | None = None):
+        self.models = models
+        self.token = token
+        # One inference at a time; concurrent requests wait their turn
+        self.busy = asyncio.Lock()
+
+    def _state(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "loaded": self.models.loaded(),
+            "backend": self.models.backend.name,
+        }
+
+    def _transcribe(self, batch: list[np.ndarray], model_name: str) -> list[dict]:
+        model = self.models.get(model_name)
+        results = self.models.backend.transcribe_batch(model, batch)
+        return [
+            {
+                "text": result["text"],
+                "segments": [
+                    {"start": s["start"], "end": s["end"], "text": s["text"]}
+                    for s in result["segments"]
+                ],
+            }
+            for result in results
+        ]
+
+    async def handle(self, header: dict, payload: bytes) -> dict:
+        op = header.get("op")
+        if op == "status":
+            return {"state": self._state()}
+        if op == "warm_up":
+            async with self.busy:
+                await asyncio.to_thread(self.models.get, header["model"])
+            return {
+                "load_time": self.models.load_times.get(header["model"], 0.0),
+                "state": self._state(),
+            }
+        if op == "transcribe":
+            samples = np.frombuffer(payload, dtype=np.float32).copy()
+            lengths = header.get("lengths", [len(samples)])
+            batch = np.split(samples, np.cumsum(lengths)[:-1])
+            async with self.busy:
+                results = await asyncio.to_thread(
+                    self._transcribe, batch, header["model"]
+                )
+            return {"results": results, "state": self._state()}
+        raise ValueError(f"Unknown operation {op!r}")
+
+    async def serve_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    # The token is checked before any payload is read
+                    header, payload = await read_message(reader, self.token)
+                except (PermissionError, ProtocolError) as e:
+                    # The rest of the message is still unread, so the stream is lost
+                    error = f"{type(e).__name__}: {e}"
+                    await write_message(writer, {"id": None, "ok": False, "error": error})
+                    break
+                try:
+                    response = {"ok": True, **await self.handle(header, payload)}
+                except Exception as e:
+                    response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                await write_message(writer, {"id": header.get("id"), **response})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def main():
+    load_dotenv()
+    address = sys.argv[1] if len(sys.argv) > 1 else os.getenv("WORKER_ADDRESS", "")
+    host, port = parse_address(address or "127.0.0.1:8765")
+
+    model_name = os.getenv("WHISPER_MODEL", "base")
+    models = ModelManager(
+        pinned=model_name,
+        idle_seconds=float(os.getenv("WHISPER_MODEL_IDLE_SECONDS", "1800")),
+        backend=get_backend(os.getenv("WHISPER_BACKEND", "whisper")),
+    )
+    models.start_evictor()
+    worker = Worker(models, os.getenv("TRANSCRIPTION_WORKER_TOKEN") or None)
+
+    server = await asyncio.start_server(worker.serve_client, host, port)
+    print(f"Transcription worker {os.getpid()} listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())